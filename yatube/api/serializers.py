@@ -0,0 +1,43 @@
+"""Компактное представление записей и комментариев для API."""
+
+
+def post_data(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments': post.comment_count,
+        **reaction_data(post),
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.pk,
+        'parent': comment.parent_id,
+        'depth': comment.depth,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+        **reaction_data(comment),
+    }
+
+
+def reaction_data(obj):
+    # Заполняется posts.reactions.annotate() для всей страницы сразу.
+    return {
+        'reactions': {reaction['kind']: reaction['count']
+                      for reaction in obj.reactions},
+        'my_reaction': obj.my_reaction,
+    }
+
+
+def page_data(page, serialize):
+    return {
+        'results': [serialize(obj) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import reactions
+from posts.consts import PAGINATOR_CONST
+from posts.models import Comment, Follow, Group, Post, User
+
+POST_TEXT = 'Тестовый пост'
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='slug',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for _ in range(PAGINATOR_CONST + 1):
+            cls.post = Post.objects.create(author=cls.user, text=POST_TEXT,
+                                           group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_feeds_are_paginated_by_cursor(self):
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('api:profile', kwargs={'username': self.user.username}),
+            reverse('api:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), PAGINATOR_CONST)
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                data = self.client.get(url, {'cursor': data['next']}).json()
+                self.assertEqual(len(data['results']), 1)
+                self.assertIsNone(data['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        urls = (
+            reverse('api:index'),
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        cursors = ('!!!', 'WyJuIiwgWyJ4IiwgInkiXSwgMl0')
+        for url in urls:
+            for cursor in cursors:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('detail', response.json())
+
+    def test_post_detail_with_comments(self):
+        data = self.client.get(reverse(
+            'api:post_detail', kwargs={'post_id': self.post.pk})).json()
+        self.assertEqual(data['post']['text'], POST_TEXT)
+        self.assertEqual(data['post']['comments'], 1)
+        self.assertEqual(data['comments']['results'][0]['author'], 'reader')
+
+    def test_unchanged_feed_returns_not_modified(self):
+        url = reverse('api:group_posts', kwargs={'slug': self.group.slug})
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.logout()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.user, text=POST_TEXT,
+                            group=self.group)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_viewer(self):
+        url = reverse('api:index')
+        reactions.react(self.reader, self.post, 'like')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'][0]['my_reaction'],
+                         'like')
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['results'][0]['my_reaction'])
+
+    def test_follow_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
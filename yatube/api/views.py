@@ -0,0 +1,110 @@
+"""Ленты в JSON для мобильных клиентов.
+
+Ответы несут сильный ETag и Last-Modified, вычисленные по счётчикам
+поколений лент из кэша. Повторный опрос неизменившейся ленты получает
+304, не выполняя запросов к ленте в базе. В ответах есть реакции
+посетителя, поэтому ETag включает его сессию, а общие кэши ответы
+не хранят. На повреждённый курсор API отвечает 400, а не первой
+страницей, чтобы клиент не принял её за продолжение ленты.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET
+from django.views.decorators.vary import vary_on_cookie
+
+from posts import reactions, timeline
+from posts.conditional import (feed_condition, follow_feeds, group_feeds,
+                               index_feeds, post_feeds, profile_feeds)
+from posts.models import Comment, Group, Post, User
+from posts.paginators import COMMENT_KEYS, InvalidCursor, paginate
+
+from .serializers import comment_data, page_data, post_data
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={
+        'ensure_ascii': False, 'separators': (',', ':')})
+
+
+def _checks_cursor(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except InvalidCursor:
+            return _json({'detail': 'Неверный курсор.'}, status=400)
+    return wrapper
+
+
+def _page(request, page, serialize):
+    reactions.annotate(page, request.user)
+    return _json(page_data(page, serialize))
+
+
+@require_GET
+@_checks_cursor
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@feed_condition(index_feeds, per_session=True)
+def index(request):
+    page = paginate(request, Post.objects.feed(), strict=True)
+    return _page(request, page, post_data)
+
+
+@require_GET
+@_checks_cursor
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@feed_condition(group_feeds, per_session=True)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    page = paginate(request, Post.objects.feed().filter(group=group),
+                    strict=True)
+    return _page(request, page, post_data)
+
+
+@require_GET
+@_checks_cursor
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@feed_condition(profile_feeds, per_session=True)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    page = paginate(request, Post.objects.feed().filter(author=author),
+                    strict=True)
+    return _page(request, page, post_data)
+
+
+@require_GET
+@_checks_cursor
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@feed_condition(follow_feeds, per_session=True)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _json({'detail': 'Требуется вход.'}, status=401)
+    page = timeline.as_posts(paginate(
+        request, timeline.feed(request.user), strict=True))
+    return _page(request, page, post_data)
+
+
+@require_GET
+@_checks_cursor
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@feed_condition(post_feeds, per_session=True)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.feed(), pk=post_id)
+    comments = (Comment.objects.filter(post=post).select_related('author')
+                .only('text', 'created', 'post_id', 'parent_id', 'path',
+                      'depth', 'author__username'))
+    page = paginate(request, comments, COMMENT_KEYS, strict=True)
+    reactions.annotate([post], request.user)
+    reactions.annotate(page, request.user)
+    return _json({
+        'post': post_data(post),
+        'comments': page_data(page, comment_data),
+    })
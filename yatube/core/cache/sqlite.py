@@ -0,0 +1,156 @@
+"""Кэш в отдельном файле SQLite, общий для всех процессов на машине.
+
+Файл открывается в режиме WAL, поэтому чтения не блокируются записью.
+Значения хранятся сериализованными через pickle, как в DatabaseCache.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+)
+EXPIRES_INDEX = 'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+NOT_EXPIRED = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        options = params.get('OPTIONS', {})
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+
+    @property
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout,
+                isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            connection.execute(EXPIRES_INDEX)
+            self._local.connection = connection
+        return connection
+
+    def _write(self, sql, params=()):
+        """Выполняет запрос в транзакции, сразу захватывающей запись."""
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = connection.execute(sql, params)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return cursor.rowcount
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        made = {self._key(key, version): key for key in keys}
+        placeholders = ', '.join('?' * len(made))
+        rows = self._connection.execute(
+            f'SELECT key, value FROM cache '
+            f'WHERE key IN ({placeholders}) AND {NOT_EXPIRED}',
+            (*made, time.time()),
+        ).fetchall()
+        return {made[key]: pickle.loads(value) for key, value in rows}
+
+    def _store(self, mode, key, value, timeout, version):
+        key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if mode == 'add':
+            sql = (f'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+                   f'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                   f'expires = excluded.expires WHERE NOT {NOT_EXPIRED}')
+            params = (key, value, expires, time.time())
+        else:
+            sql = 'REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)'
+            params = (key, value, expires)
+        stored = self._write(sql, params)
+        self._cull()
+        return bool(stored)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store('add', key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store('set', key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._write(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {NOT_EXPIRED}',
+            (self.get_backend_timeout(timeout), key, time.time())))
+
+    def delete(self, key, version=None):
+        self._write('DELETE FROM cache WHERE key = ?',
+                    (self._key(key, version),))
+
+    def has_key(self, key, version=None):
+        return self._connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {NOT_EXPIRED}',
+            (self._key(key, version), time.time())).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно увеличивает значение в одной транзакции записи."""
+        key = self._key(key, version)
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {NOT_EXPIRED}',
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def clear(self):
+        self._write('DELETE FROM cache')
+
+    def _cull(self):
+        if self._max_entries <= 0:
+            return
+        now = time.time()
+        self._write('DELETE FROM cache WHERE expires <= ?', (now,))
+        count = self._connection.execute(
+            'SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries and self._cull_frequency:
+            self._write(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,))
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время работы потока: открывать файл
+        # заново на каждый запрос дороже, чем держать его открытым.
+        pass
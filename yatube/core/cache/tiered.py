@@ -0,0 +1,199 @@
+"""Двухуровневый кэш: небольшой LRU в памяти процесса перед общим кэшем.
+
+Чтения обслуживаются из памяти процесса, промахи идут в общий кэш.
+Ключ живёт в памяти не дольше LOCAL_TIMEOUT и не дольше собственного
+timeout: срок истечения хранится в общем кэше рядом со значением.
+Изменённые ключи копятся и раз в CHECK_INTERVAL секунд (или в конце
+запроса) публикуются пачкой: счётчик поколения увеличивается один раз
+на всю пачку, рядом остаются записи об изменённых ключах. Раз
+в CHECK_INTERVAL секунд процесс сверяет поколение и выбрасывает из
+памяти изменённые в других процессах ключи; если отстал больше, чем на
+LOG_SIZE изменений, или кэш был очищен, очищает локальный уровень
+целиком.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.signals import request_finished
+
+GENERATION_KEY = 'tiered:generation'
+CHANGED_KEY = 'tiered:changed:{}'
+DEADLINE_KEY = 'tiered:deadline:{}'
+
+
+def _initial():
+    # После очистки поколение не должно совпасть с тем, которое уже
+    # видели другие процессы.
+    return int(time.time() * 1000)
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', location or 'shared')
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 60))
+        self._check_interval = float(options.get('CHECK_INTERVAL', 1))
+        self._log_size = int(options.get('LOG_SIZE', 1000))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked = 0.0
+        self._pending = []
+        self._published = time.monotonic()
+        request_finished.connect(self.publish)
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _sync(self):
+        self.publish()
+        now = time.monotonic()
+        if now - self._checked < self._check_interval:
+            return
+        self._checked = now
+        generation = self.shared.get(GENERATION_KEY)
+        if generation == self._generation:
+            return
+        if (self._generation is None or generation is None
+                or not 0 < generation - self._generation <= self._log_size):
+            changed = None
+        else:
+            changed = self.shared.get_many([
+                CHANGED_KEY.format(number) for number in
+                range(self._generation + 1, generation + 1)
+            ])
+        with self._lock:
+            if changed is None or len(changed) < generation - self._generation:
+                self._local.clear()
+            else:
+                for key in changed.values():
+                    self._local.pop(key, None)
+        self._generation = generation
+
+    def _publish(self, key):
+        """Сообщает остальным процессам, что ключ изменился."""
+        with self._lock:
+            self._pending.append(key)
+            due = time.monotonic() - self._published >= self._check_interval
+        if due:
+            self.publish()
+
+    def publish(self, **kwargs):
+        """Публикует накопленные изменения одной пачкой."""
+        with self._lock:
+            keys, self._pending = self._pending, []
+            self._published = time.monotonic()
+        if not keys:
+            return
+        try:
+            generation = self.shared.incr(GENERATION_KEY, len(keys))
+        except ValueError:
+            self.shared.add(GENERATION_KEY, _initial(), None)
+            generation = self.shared.incr(GENERATION_KEY, len(keys))
+        first = generation - len(keys) + 1
+        self.shared.set_many(
+            {CHANGED_KEY.format(first + number): key
+             for number, key in enumerate(keys)},
+            self._check_interval * 10 + self._local_timeout)
+
+    def _remember(self, key, value, deadline=None):
+        lifetime = self._local_timeout
+        if deadline is not None:
+            lifetime = min(lifetime, deadline - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._local[key] = (time.monotonic() + lifetime, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        made = self.make_key(key, version)
+        with self._lock:
+            entry = self._local.get(made)
+            if entry is not None and entry[0] > time.monotonic():
+                self._local.move_to_end(made)
+                return entry[1]
+        deadline_key = DEADLINE_KEY.format(key)
+        values = self.shared.get_many([key, deadline_key], version=version)
+        if key not in values:
+            return default
+        self._remember(made, values[key], values.get(deadline_key))
+        return values[key]
+
+    def _deadline(self, timeout):
+        timeout = self._timeout(timeout)
+        return None if timeout is None else time.time() + timeout
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made = self.make_key(key, version)
+        timeout = self._timeout(timeout)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.shared.set(DEADLINE_KEY.format(key),
+                            self._deadline(timeout), timeout,
+                            version=version)
+            self._forget(made)
+            self._publish(made)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        made = self.make_key(key, version)
+        self.shared.set_many(
+            {key: value, DEADLINE_KEY.format(key): self._deadline(timeout)},
+            timeout, version=version)
+        self._forget(made)
+        self._publish(made)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        touched = self.shared.touch(key, timeout, version=version)
+        if touched:
+            self.shared.set(DEADLINE_KEY.format(key),
+                            self._deadline(timeout), timeout,
+                            version=version)
+            made = self.make_key(key, version)
+            self._forget(made)
+            self._publish(made)
+        return touched
+
+    def delete(self, key, version=None):
+        made = self.make_key(key, version)
+        self.shared.delete_many([key, DEADLINE_KEY.format(key)],
+                                version=version)
+        self._forget(made)
+        self._publish(made)
+
+    def incr(self, key, delta=1, version=None):
+        made = self.make_key(key, version)
+        value = self.shared.incr(key, delta, version=version)
+        self._forget(made)
+        self._publish(made)
+        return value
+
+    def clear(self):
+        current = self.shared.get(GENERATION_KEY) or 0
+        self.shared.clear()
+        # Новое поколение без записей об изменениях и дальше LOG_SIZE от
+        # прежнего заставляет остальные процессы очистить локальный
+        # уровень целиком.
+        self.shared.set(GENERATION_KEY,
+                        max(_initial(), current + self._log_size + 1), None)
+        with self._lock:
+            self._local.clear()
+            self._pending = []
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+SCHEMA = ('CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+          'pub_date REAL)')
+
+
+def _connect(path, pragmas, timeout):
+    connection = sqlite3.connect(path, timeout=timeout,
+                                 isolation_level=None,
+                                 check_same_thread=False)
+    apply_pragmas(connection.cursor(), pragmas)
+    return connection
+
+
+def _writer(path, pragmas, timeout, deadline, result):
+    connection = _connect(path, pragmas, timeout)
+    while time.monotonic() < deadline:
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('INSERT INTO post (text, pub_date) '
+                               'VALUES (?, ?)', ('x' * 200, time.time()))
+            connection.execute('COMMIT')
+            result['writes'] += 1
+        except sqlite3.OperationalError:
+            result['errors'] += 1
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+    connection.close()
+
+
+def _reader(path, pragmas, timeout, deadline, result):
+    connection = _connect(path, pragmas, timeout)
+    while time.monotonic() < deadline:
+        try:
+            connection.execute('SELECT id, text FROM post '
+                               'ORDER BY id DESC LIMIT 10').fetchall()
+            result['reads'] += 1
+        except sqlite3.OperationalError:
+            result['errors'] += 1
+    connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность записи в SQLite '
+            'с настройками по умолчанию и с SQLITE_PRAGMAS при '
+            'одновременных писателях и читателях.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def run(self, pragmas, timeout, options):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        connection = _connect(path, pragmas, timeout)
+        connection.execute(SCHEMA)
+        connection.close()
+        result = {'writes': 0, 'reads': 0, 'errors': 0}
+        deadline = time.monotonic() + options['seconds']
+        threads = [
+            threading.Thread(target=target,
+                             args=(path, pragmas, timeout, deadline, result))
+            for target, count in ((_writer, options['writers']),
+                                  (_reader, options['readers']))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+        return {key: value / options['seconds'] if key != 'errors' else value
+                for key, value in result.items()}
+
+    def handle(self, *args, **options):
+        timeout = settings.DATABASES['default'].get(
+            'OPTIONS', {}).get('timeout', 5)
+        profiles = (
+            ('по умолчанию', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        for name, pragmas in profiles:
+            result = self.run(pragmas, timeout, options)
+            self.stdout.write(
+                f'{name}: записей в секунду {result["writes"]:.0f}, '
+                f'чтений в секунду {result["reads"]:.0f}, '
+                f'ошибок блокировки {result["errors"]}')
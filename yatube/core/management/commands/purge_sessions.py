@@ -0,0 +1,36 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# Хранилища, сессии которых лежат в таблице django_session.
+DB_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    help = ('Удаляет истёкшие сессии пачками, не блокируя таблицу '
+            'одним большим DELETE.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        if settings.SESSION_ENGINE not in DB_ENGINES:
+            # Кэш и cookie сами забывают истёкшие сессии.
+            import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+            return
+        expired = Session.objects.filter(expire_date__lt=timezone.now())
+        removed = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)
+                        [:batch_size])
+            if not keys:
+                break
+            removed += Session.objects.filter(session_key__in=keys).delete()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено сессий: {removed}.'))
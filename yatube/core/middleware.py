@@ -0,0 +1,25 @@
+from django.conf import settings
+
+from . import routers
+
+PIN_COOKIE = 'primary_pin'
+
+
+class ReadYourWritesMiddleware:
+    """Направляет чтения пользователя в основную базу в течение
+    REPLICA_PIN_SECONDS после его записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.start(pinned=PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.finish()
+        if wrote and routers.REPLICA in settings.DATABASES:
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,53 @@
+"""Чтение с реплики, запись в основную базу.
+
+Пока запрос ничего не записал, чтения идут на реплику, если она
+настроена. Вне запросов (миграции, команды, фоновые задачи) всё идёт
+в основную базу. После первой записи и до конца запроса, а также в течение
+REPLICA_PIN_SECONDS после неё (ReadYourWritesMiddleware) чтения
+пользователя идут в основную базу: он сразу видит свою запись или
+комментарий, даже если реплика отстаёт.
+"""
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+
+_state = threading.local()
+
+
+def start(pinned=False):
+    _state.active = True
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def finish():
+    """Завершает запрос; возвращает, была ли в нём запись."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.active = _state.pinned = _state.wrote = False
+    return wrote
+
+
+def pinned():
+    return (not getattr(_state, 'active', False) or _state.pinned
+            or _state.wrote)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if REPLICA not in settings.DATABASES or pinned():
+            return PRIMARY
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -0,0 +1,197 @@
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import routers
+from .cache.sqlite import SQLiteCache
+from .cache.tiered import CHANGED_KEY, GENERATION_KEY, TieredCache
+from .middleware import PIN_COOKIE, ReadYourWritesMiddleware
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {})
+
+    def test_set_get_add(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.add('other', 2))
+        self.assertEqual(self.cache.get_many(['key', 'other', 'none']),
+                         {'key': {'value': 1}, 'other': 2})
+
+    def test_expired_value_is_missing(self):
+        self.cache.set('key', 1, 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 2))
+
+    def test_incr_is_shared_between_connections(self):
+        other = SQLiteCache(self.path, {})
+        self.cache.set('counter', 1)
+        other.incr('counter')
+        self.assertEqual(self.cache.incr('counter', 2), 4)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-test',
+    },
+})
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        params = {'OPTIONS': {'SHARED': 'shared', 'CHECK_INTERVAL': 0}}
+        self.first = TieredCache('', params)
+        self.second = TieredCache('', params)
+
+    def test_read_served_from_local_tier(self):
+        self.first.set('key', 1)
+        self.assertEqual(self.first.get('key'), 1)
+        caches['shared'].delete('key')
+        self.assertEqual(self.first.get('key'), 1)
+
+    def test_write_invalidates_other_process(self):
+        self.first.set('key', 1)
+        self.assertEqual(self.second.get('key'), 1)
+        self.first.set('key', 2)
+        self.assertEqual(self.second.get('key'), 2)
+        self.first.incr('key')
+        self.assertEqual(self.second.get('key'), 3)
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+
+    def test_local_entry_respects_key_timeout(self):
+        self.first.set('key', 1, timeout=5)
+        self.assertEqual(self.first.get('key'), 1)
+        caches['shared'].delete('key')
+        with mock.patch('core.cache.tiered.time.monotonic',
+                        return_value=time.monotonic() + 10):
+            self.assertIsNone(self.first.get('key'))
+
+    def test_clear_invalidates_other_process(self):
+        self.first.set('key', 1)
+        self.assertEqual(self.second.get('key'), 1)
+        # Очистка в ту же миллисекунду, что и первая запись.
+        with mock.patch('core.cache.tiered.time.time',
+                        return_value=caches['shared'].get(GENERATION_KEY)
+                        / 1000):
+            self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+
+    def test_changes_are_published_in_batches(self):
+        writer = TieredCache('', {'OPTIONS': {'SHARED': 'shared',
+                                              'CHECK_INTERVAL': 60}})
+        for number in range(3):
+            writer.set(f'key{number}', number)
+        self.assertIsNone(caches['shared'].get(GENERATION_KEY))
+        writer.publish()
+        generation = caches['shared'].get(GENERATION_KEY)
+        changed = caches['shared'].get_many(
+            [CHANGED_KEY.format(generation - number) for number in range(3)])
+        self.assertEqual(sorted(changed.values()),
+                         [writer.make_key(f'key{number}')
+                          for number in range(3)])
+
+
+class SessionTest(TestCase):
+    def session_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [query for query in queries
+                if 'django_session' in query['sql']]
+
+    def test_session_store_is_read_lazily(self):
+        self.assertEqual(self.session_queries('/'), [])
+        user = get_user_model().objects.create_user(username='reader')
+        self.client.force_login(user)
+        caches['default'].clear()
+        self.assertEqual(len(self.session_queries('/')), 1)
+        self.assertEqual(self.session_queries('/'), [])
+
+    def test_purge_sessions_in_batches(self):
+        for _ in range(5):
+            SessionStore().create()
+        Session.objects.update(expire_date=timezone.now() - timedelta(1))
+        SessionStore().create()
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertIn('5', out.getvalue())
+        self.assertEqual(Session.objects.count(), 1)
+
+
+class DatabaseTest(TestCase):
+    def test_sqlite_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0],
+                             settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            # 1 — NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_benchmark_compares_profiles(self):
+        out = StringIO()
+        call_command('benchmark_writes', writers=2, readers=1, seconds=0.2,
+                     stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+@mock.patch.dict(settings.DATABASES, {routers.REPLICA: {}})
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        routers.finish()
+
+    def test_reads_after_write_go_to_primary(self):
+        routers.start()
+        self.assertEqual(self.router.db_for_read(None), routers.REPLICA)
+        self.assertEqual(self.router.db_for_write(None), routers.PRIMARY)
+        self.assertEqual(self.router.db_for_read(None), routers.PRIMARY)
+        routers.finish()
+        self.assertEqual(self.router.db_for_read(None), routers.PRIMARY)
+        routers.start()
+        self.assertEqual(self.router.db_for_read(None), routers.REPLICA)
+
+    def test_middleware_pins_reads_after_write(self):
+        seen = []
+
+        def write(request):
+            seen.append(self.router.db_for_read(None))
+            self.router.db_for_write(None)
+            return HttpResponse()
+
+        response = ReadYourWritesMiddleware(write)(self.factory.post('/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'],
+                         settings.REPLICA_PIN_SECONDS)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        ReadYourWritesMiddleware(write)(request)
+        self.assertEqual(seen, [routers.REPLICA, routers.PRIMARY])
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment, Follow
 
 
@@ -16,6 +17,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск идёт по индексу, а не через LIKE по всей таблице.
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search.find(search_term)), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
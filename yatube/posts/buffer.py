@@ -0,0 +1,99 @@
+"""Отложенная запись часто меняющихся счётчиков.
+
+Просмотр записи не выполняет UPDATE сразу: приращение копится в памяти
+процесса и записывается в базу пачкой в конце запроса, если с прошлой
+записи прошло COUNTER_FLUSH_INTERVAL секунд или накопилось
+COUNTER_BUFFER_SIZE счётчиков. Одинаковые приращения одного поля
+записываются одним UPDATE ... WHERE pk IN (...). Чтобы приращения
+не ждали следующего запроса, фоновый поток процесса раз
+в COUNTER_FLUSH_INTERVAL секунд записывает то, что накопилось.
+При штатном завершении процесса остаток записывается обработчиком
+atexit.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+
+from .consts import COUNTER_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = defaultdict(int)
+_state = {'flushed': time.monotonic(), 'timer_pid': None}
+
+
+def _run_timer(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            maybe_flush()
+        finally:
+            connections.close_all()
+
+
+def _start_timer():
+    # Поток не переживает fork, поэтому запоминается процесс,
+    # в котором он запущен.
+    if (not settings.COUNTER_FLUSH_INTERVAL
+            or _state['timer_pid'] == os.getpid()):
+        return
+    _state['timer_pid'] = os.getpid()
+    threading.Thread(target=_run_timer, name='counter-flush',
+                     args=(settings.COUNTER_FLUSH_INTERVAL,),
+                     daemon=True).start()
+
+
+def add(model, pk, field, delta=1):
+    with _lock:
+        _pending[(model._meta.label, field, pk)] += delta
+        _start_timer()
+
+
+def pending(model, pk, field):
+    """Ещё не записанное в базу приращение счётчика."""
+    return _pending.get((model._meta.label, field, pk), 0)
+
+
+def maybe_flush():
+    elapsed = time.monotonic() - _state['flushed']
+    if (len(_pending) >= COUNTER_BUFFER_SIZE
+            or elapsed >= settings.COUNTER_FLUSH_INTERVAL):
+        flush()
+
+
+def flush():
+    """Записывает накопленные приращения; возвращает число счётчиков."""
+    with _lock:
+        deltas = dict(_pending)
+        _pending.clear()
+        _state['flushed'] = time.monotonic()
+    if not deltas:
+        return 0
+    groups = defaultdict(list)
+    for (label, field, pk), delta in deltas.items():
+        if delta:
+            groups[label, field, delta].append(pk)
+    try:
+        with transaction.atomic():
+            for (label, field, delta), pks in groups.items():
+                apps.get_model(label).objects.filter(pk__in=pks).update(
+                    **{field: F(field) + delta})
+    except DatabaseError:
+        logger.exception('Не удалось записать счётчики')
+        with _lock:
+            for key, delta in deltas.items():
+                _pending[key] += delta
+        return 0
+    return len(deltas)
+
+
+atexit.register(flush)
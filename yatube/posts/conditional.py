@@ -0,0 +1,131 @@
+"""Условные ответы и политика кэширования страниц лент.
+
+ETag и Last-Modified вычисляются по счётчикам поколений лент из кэша,
+поэтому повторный запрос неизменившейся страницы получает 304 без
+рендеринга шаблона и без запросов к ленте в базе. Страницы вошедшего
+пользователя зависят от его сессии (имя в шапке, токен CSRF в формах),
+поэтому её ключ входит в ETag.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import generations
+from .consts import LOOKUP_TIMEOUT, PUBLIC_PAGE_MAX_AGE
+from .models import Group, Post, User
+
+
+def _lookup_key(model, lookup, value, field):
+    return f'lookup:{model._meta.model_name}:{lookup}:{value}:{field}'
+
+
+def cached_field(model, lookup, value, field='pk'):
+    """Значение поля объекта по уникальному полю с кэшированием."""
+    key = _lookup_key(model, lookup, value, field)
+    result = cache.get(key)
+    if result is None:
+        result = model.objects.filter(**{lookup: value}).values_list(
+            field, flat=True).first()
+        if result is not None:
+            cache.set(key, result, LOOKUP_TIMEOUT)
+    return result
+
+
+def forget_field(model, lookup, *values, field='pk'):
+    """Удаляет значения, запомненные cached_field для values."""
+    cache.delete_many([_lookup_key(model, lookup, value, field)
+                       for value in values if value is not None])
+
+
+def _session(request):
+    if request.user.is_authenticated:
+        return request.session.session_key or ''
+    return ''
+
+
+def feed_condition(feeds, per_session=False):
+    """Условный GET по поколениям лент, которые возвращает feeds().
+
+    per_session нужен HTML-страницам: в них есть данные сессии.
+    """
+    def etag(request, *args, **kwargs):
+        names = feeds(request, *args, **kwargs)
+        if not names:
+            return None
+        session = _session(request) if per_session else ''
+        value = (f'{",".join(names)}|{generations.version(*names)}|'
+                 f'{request.get_full_path()}|{session}')
+        return hashlib.sha1(value.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        names = feeds(request, *args, **kwargs)
+        return generations.modified(*names) if names else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _viewer(request):
+    # Подписки посетителя видны в кнопках подписки на карточках лент
+    # и на страницах профилей.
+    if request.user.is_authenticated:
+        return (generations.timeline(request.user.pk),)
+    return ()
+
+
+def index_feeds(request):
+    return (generations.INDEX, generations.GROUPS, *_viewer(request))
+
+
+def popular_feeds(request):
+    return (generations.TRENDING, generations.INDEX, generations.GROUPS,
+            *_viewer(request))
+
+
+def group_feeds(request, slug):
+    pk = cached_field(Group, 'slug', slug)
+    return pk is not None and (generations.group(pk), *_viewer(request))
+
+
+def profile_feeds(request, username):
+    pk = cached_field(User, 'username', username)
+    return pk is not None and (generations.author(pk), generations.GROUPS,
+                               *_viewer(request))
+
+
+def follow_feeds(request):
+    # В ленту подписок подмешиваются записи популярных авторов, поэтому
+    # она зависит и от общей ленты.
+    if not request.user.is_authenticated:
+        return None
+    return (generations.timeline(request.user.pk), generations.INDEX,
+            generations.GROUPS)
+
+
+def post_feeds(request, post_id, **kwargs):
+    # На странице записи выводятся счётчики её автора.
+    author_id = cached_field(Post, 'pk', post_id, 'author_id')
+    return author_id is not None and (
+        generations.post(post_id), generations.author(author_id),
+        generations.GROUPS)
+
+
+def cache_policy(max_age=PUBLIC_PAGE_MAX_AGE):
+    """Разрешает общим кэшам хранить страницу анонимного посетителя
+    max_age секунд; страницы вошедших пользователей браузер хранит
+    только у себя и перепроверяет по ETag."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if (request.user.is_authenticated or response.cookies
+                    or response.status_code not in (200, 304)):
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=max_age)
+            return response
+        return wrapper
+    return decorator
@@ -1,3 +1,92 @@
 SORTING_RECORDS = 10
 PAGINATOR_CONST = 10
+# Старые ссылки ?page=N открываются через OFFSET только до этой
+# страницы, дальше листают по курсору.
+PAGINATOR_OFFSET_PAGES = 5
 SELF_TEXT_STR = 15
+# Авторы с таким числом подписчиков не раскладываются по лентам при
+# публикации, их записи подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+# Сколько последних записей автора попадает в ленту при подписке.
+TIMELINE_BACKFILL_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+# Сколько лучших результатов поиска доступно для постраничного вывода.
+SEARCH_LIMIT = 1000
+# Основы короче этой длины ищутся точно, длиннее — по префиксу.
+SEARCH_PREFIX_LENGTH = 3
+# Вес слова из текста записи относительно слова из комментария.
+SEARCH_TEXT_WEIGHT = 2
+SEARCH_TERM_LENGTH = 64
+# Сколько документов переиндексируется и вставляется за один запрос.
+SEARCH_BATCH_SIZE = 500
+# Размеры, в которых шаблоны выводят изображение записи:
+# название: (геометрия sorl-thumbnail, параметры).
+IMAGE_GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'detail': ('400x200', {'crop': 'center', 'upscale': True}),
+}
+# Ширины уменьшенных копий изображения записи для srcset.
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+IMAGE_VARIANT_QUALITY = 80
+# Ограничения загружаемых изображений записей.
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+# Больше этого размера по длинной стороне изображение уменьшается.
+IMAGE_MAX_SIDE = 2560
+IMAGE_QUALITY = 90
+# Сколько первых байтов файла читается для определения формата.
+IMAGE_HEADER_LIMIT = 256 * 1024
+# Файлы изображений моложе этого возраста (в секундах) не считаются
+# брошенными: их может сохранять ещё не завершённый запрос.
+MEDIA_ORPHAN_AGE = 60 * 60
+# Сколько секунд помнить идентификаторы групп и авторов по slug и имени,
+# чтобы проверять актуальность страницы без запросов к базе.
+LOOKUP_TIMEOUT = 60 * 60
+# Сколько секунд общий кэш может отдавать страницу анонимным посетителям.
+PUBLIC_PAGE_MAX_AGE = 60
+# Сколько секунд хранится целая страница ленты для анонимных посетителей;
+# изменения в ленте делают её неактуальной раньше.
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Сколько комментариев показывается сразу и подгружается за раз.
+COMMENTS_PER_PAGE = 20
+# Ширина сегмента материализованного пути комментария: идентификатор,
+# дополненный нулями, чтобы пути сортировались как строки.
+COMMENT_PATH_STEP = 10
+# Наибольшая глубина ветки; ответы глубже прикрепляются к последнему
+# допустимому уровню.
+COMMENT_MAX_DEPTH = 5
+# Комментарии с этой глубины скрываются под ссылкой «ещё ответов».
+COMMENT_COLLAPSE_DEPTH = 3
+# Виды реакций на записи и комментарии.
+REACTIONS = (
+    ('like', 'Нравится'),
+    ('laugh', 'Смешно'),
+    ('sad', 'Грустно'),
+)
+REACTION_KIND_LENGTH = 16
+# На сколько строк делится счётчик реакций одного объекта, чтобы
+# одновременные реакции на популярную запись не ждали одну блокировку.
+REACTION_SHARDS = 8
+# Сколько счётчиков комментариев удаляется одним запросом.
+REACTION_BATCH_SIZE = 500
+# Сколько разных счётчиков копится в памяти процесса до записи в базу.
+COUNTER_BUFFER_SIZE = 1000
+# Популярные записи (posts/trending.py): в рейтинг попадают записи
+# не старше стольких секунд.
+TRENDING_WINDOW = 7 * 24 * 60 * 60
+# За столько секунд свежести запись получает столько же очков рейтинга,
+# сколько за десятикратный рост активности.
+TRENDING_DECAY = 12 * 60 * 60
+# Вес комментария, реакции, просмотра и подписчика автора в активности.
+TRENDING_WEIGHTS = {
+    'comments': 3,
+    'reactions': 2,
+    'views': 0.1,
+    'followers': 0.05,
+}
+TRENDING_BATCH_SIZE = 500
+# Сколько секунд списки подписок хранятся в кэше (posts/graph.py).
+GRAPH_TIMEOUT = 60 * 60
+# Сколько авторов предлагается в блоке «Кого почитать».
+SUGGESTIONS_LIMIT = 5
@@ -0,0 +1,80 @@
+"""Денормализованные счётчики записей, комментариев и подписок.
+
+Счётчики обновляются атомарным UPDATE ... SET field = field + delta,
+поэтому страницы профиля и записи не выполняют агрегатных запросов.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (Comment, Follow, Group, Post, StoredFile, User,
+                     UserStats)
+
+
+def _add(queryset, field, delta, **changes):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta}, **changes)
+
+
+def add_user(user_id, field, delta):
+    stats = UserStats.objects.filter(user_id=user_id)
+    if not _add(stats, field, delta) and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        _add(stats, field, delta)
+
+
+def user_stats(user):
+    """Счётчики пользователя; без строки UserStats — нулевые.
+
+    Строки нет у пользователей из loaddata и bulk_create, она создаётся
+    при первом изменении счётчика (add_user).
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def add_group(group_id, delta):
+    if group_id is not None:
+        _add(Group.objects.filter(pk=group_id), 'post_count', delta)
+
+
+def add_comment(post_id, delta):
+    # Число комментариев выводится в карточке записи, поэтому запись
+    # считается изменённой и её карточка рендерится заново.
+    _add(Post.objects.filter(pk=post_id), 'comment_count', delta,
+         updated=timezone.now())
+
+
+def add_file(name, delta):
+    files = StoredFile.objects.filter(name=name)
+    if not _add(files, 'references', delta) and delta > 0:
+        StoredFile.objects.get_or_create(name=name)
+        _add(files, 'references', delta)
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def rebuild():
+    """Пересчитывает все счётчики по данным таблиц."""
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id) for user_id in
+         User.objects.filter(stats__isnull=True).values_list('pk', flat=True)),
+        ignore_conflicts=True)
+    UserStats.objects.update(
+        post_count=_count(Post, 'author'),
+        follower_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+    Group.objects.update(post_count=_count(Post, 'group'))
+    Post.objects.update(comment_count=_count(Comment, 'post'))
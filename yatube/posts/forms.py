@@ -1,5 +1,6 @@
 from django import forms
 from .models import Post, Comment
+from . import uploads
 from django.utils.translation import gettext_lazy as ola
 
 
@@ -15,6 +16,15 @@ class PostForm(forms.ModelForm):
             'text': ola('Запишите свои мысли в этом поле *^*'),
         }
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean_image(self):
+        if 'image' in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors['image'])
+        return uploads.process(self.cleaned_data['image'])
+
     def clean_subject(self):
         data = self.cleaned_data['subject']
         return data
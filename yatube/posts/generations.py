@@ -0,0 +1,95 @@
+"""Счётчики поколений лент для версионного кэша фрагментов.
+
+Ключ закэшированной страницы ленты включает поколение ленты. Изменение
+записи, комментария или группы увеличивает поколения затронутых лент,
+и следующие запросы рендерят страницу заново, а старые фрагменты
+вытесняются из кэша по времени жизни.
+"""
+import datetime
+import time
+
+from django.core.cache import cache
+
+KEY = 'feed:generation:{}'
+MODIFIED_KEY = 'feed:modified:{}'
+INDEX = 'index'
+GROUPS = 'groups'
+TRENDING = 'trending'
+
+
+def group(group_id):
+    return f'group:{group_id}'
+
+
+def author(author_id):
+    return f'author:{author_id}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def timeline(user_id):
+    return f'timeline:{user_id}'
+
+
+def _initial():
+    # После вытеснения счётчика из кэша он не должен вернуться
+    # к значению, под которым уже лежат старые фрагменты.
+    return int(time.time() * 1000)
+
+
+def version(*feeds):
+    """Возвращает строку поколений перечисленных лент."""
+    keys = [KEY.format(feed) for feed in feeds]
+    values = cache.get_many(keys)
+    missing = {key: _initial() for key in keys if key not in values}
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, None)
+        values.update(cache.get_many(missing))
+    return '.'.join(str(values.get(key, 0)) for key in keys)
+
+
+def bump(*feeds):
+    """Увеличивает поколения лент, делая их кэш неактуальным."""
+    feeds = set(feeds)
+    for feed in feeds:
+        key = KEY.format(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+    now = time.time()
+    cache.set_many({MODIFIED_KEY.format(feed): now for feed in feeds}, None)
+
+
+def modified(*feeds):
+    """Время последнего изменения лент или None, если лент нет.
+
+    Если время ленты неизвестно (она не менялась с запуска или значение
+    вытеснено из кэша), им становится текущий момент: он не раньше
+    настоящего изменения, поэтому клиент не получит 304 на изменённую
+    ленту.
+    """
+    keys = [MODIFIED_KEY.format(feed) for feed in feeds]
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        values.update(cache.get_many(missing))
+    if not values:
+        return None
+    return datetime.datetime.fromtimestamp(max(values.values()),
+                                           tz=datetime.timezone.utc)
+
+
+def post_feeds(instance, group_ids=()):
+    """Ленты, в которых показывается запись."""
+    feeds = [INDEX, author(instance.author_id), post(instance.pk)]
+    feeds.extend(group(group_id)
+                 for group_id in (instance.group_id, *group_ids)
+                 if group_id is not None)
+    return feeds
@@ -0,0 +1,132 @@
+"""Граф подписок в виде компактных множеств идентификаторов.
+
+Для каждого пользователя в кэше хранятся отсортированные массивы
+идентификаторов тех, на кого он подписан, и его подписчиков (array('I'),
+четыре байта на подписку). Проверка подписки — двоичный поиск, списки
+нескольких пользователей загружаются одним get_many, а недостающие —
+одним запросом к базе. Сигналы подписок сбрасывают списки обоих
+пользователей.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .consts import GRAPH_TIMEOUT, SUGGESTIONS_LIMIT
+from .models import Follow
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+KEY = 'graph:{}:{}'
+# Поле Follow, по которому строится список, и поле со значениями.
+FIELDS = {
+    FOLLOWING: ('user_id', 'author_id'),
+    FOLLOWERS: ('author_id', 'user_id'),
+}
+
+
+class IdSet:
+    """Неизменяемое множество идентификаторов на отсортированном массиве."""
+
+    __slots__ = ('ids',)
+
+    def __init__(self, ids=()):
+        self.ids = array('I', sorted(set(ids)))
+
+    @classmethod
+    def from_bytes(cls, data):
+        ids = cls()
+        ids.ids.frombytes(data)
+        return ids
+
+    def to_bytes(self):
+        return self.ids.tobytes()
+
+    def __contains__(self, pk):
+        position = bisect_left(self.ids, pk)
+        return position < len(self.ids) and self.ids[position] == pk
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __and__(self, other):
+        smaller, larger = sorted((self, other), key=len)
+        return IdSet(pk for pk in smaller if pk in larger)
+
+
+def _load(direction, user_ids):
+    """Списки direction для пользователей: из кэша или одним запросом."""
+    user_ids = set(user_ids)
+    keys = {KEY.format(direction, pk): pk for pk in user_ids}
+    found = {keys[key]: IdSet.from_bytes(data)
+             for key, data in cache.get_many(keys).items()}
+    missing = user_ids - set(found)
+    if missing:
+        field, value = FIELDS[direction]
+        ids = {pk: [] for pk in missing}
+        rows = Follow.objects.filter(**{f'{field}__in': missing})
+        for owner, other in rows.values_list(field, value):
+            ids[owner].append(other)
+        loaded = {pk: IdSet(values) for pk, values in ids.items()}
+        cache.set_many({KEY.format(direction, pk): ids.to_bytes()
+                        for pk, ids in loaded.items()}, GRAPH_TIMEOUT)
+        found.update(loaded)
+    return found
+
+
+def following(user_id):
+    return _load(FOLLOWING, [user_id])[user_id]
+
+
+def followers(user_id):
+    return _load(FOLLOWERS, [user_id])[user_id]
+
+
+def is_following(user_id, author_id):
+    if not user_id:
+        return False
+    return author_id in following(user_id)
+
+
+def follower_count(user_id):
+    return len(followers(user_id))
+
+
+def mutual(user_id):
+    """Взаимные подписки пользователя."""
+    return following(user_id) & followers(user_id)
+
+
+def suggestions(user_id, limit=SUGGESTIONS_LIMIT):
+    """Авторы, на которых подписаны те, на кого подписан пользователь.
+
+    Возвращает идентификаторы по убыванию числа таких подписок.
+    """
+    followed = following(user_id)
+    counts = Counter()
+    for ids in _load(FOLLOWING, followed).values():
+        counts.update(pk for pk in ids
+                      if pk != user_id and pk not in followed)
+    return [pk for pk, _ in counts.most_common(limit)]
+
+
+def annotate(users, viewer):
+    """Отмечает у пользователей, подписан ли на них посетитель."""
+    followed = (following(viewer.pk) if viewer.is_authenticated
+                else IdSet())
+    for user in users:
+        user.is_followed = user.pk in followed
+    return users
+
+
+def changed(user_id, author_id):
+    """Сбрасывает списки после подписки или отписки."""
+    keys = [KEY.format(FOLLOWING, user_id), KEY.format(FOLLOWERS, author_id)]
+    cache.delete_many(keys)
+    # Читатель мог положить в кэш списки до фиксации транзакции.
+    transaction.on_commit(lambda: cache.delete_many(keys))
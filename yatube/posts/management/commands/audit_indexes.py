@@ -0,0 +1,82 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import threads, timeline, trending
+from posts.consts import COMMENTS_PER_PAGE, PAGINATOR_CONST
+from posts.models import Follow, Post, User
+from posts.paginators import COMMENT_KEYS, CursorPaginator
+
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (TABLE )?(?P<table>\w+)(?!.*USING)'),
+    'postgresql': re.compile(r'Seq Scan on (?P<table>\w+)'),
+    'mysql': re.compile(r'\btype: ALL\b.*?table: (?P<table>\w+)'),
+}
+TEMP_SORT = re.compile(r'TEMP B-TREE|Sort Method|Using filesort')
+
+
+def page(queryset, keys=None, per_page=PAGINATOR_CONST):
+    paginator = CursorPaginator(queryset, per_page,
+                                *([keys] if keys else []))
+    return paginator.object_list[:per_page + 1]
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN для запросов страниц со списками записей '
+            'и отмечает полные просмотры таблиц.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой, если найден полный просмотр.')
+
+    def listings(self):
+        sample = Post.objects.values(
+            'pk', 'author_id', 'group_id').first() or {}
+        author_id = sample.get('author_id') or 0
+        group_id = sample.get('group_id') or 0
+        reader = User(pk=Follow.objects.values_list(
+            'user_id', flat=True).first() or 0)
+        feed = Post.objects.feed().with_follow_state(reader)
+        return {
+            'index': page(feed),
+            'popular': page(trending.feed(reader), trending.SCORE_KEYS),
+            'group_posts': page(feed.filter(group_id=group_id)),
+            'profile': page(
+                Post.objects.feed().filter(author_id=author_id)),
+            'follow_index': page(timeline.feed(reader)),
+            'post_detail comments': page(
+                threads.visible(sample.get('pk') or 0),
+                COMMENT_KEYS, COMMENTS_PER_PAGE),
+            'profile following': Follow.objects.filter(
+                user_id=reader.pk, author_id=author_id),
+        }
+
+    def handle(self, *args, **options):
+        full_scan = FULL_SCAN.get(connection.vendor)
+        if full_scan is None:
+            raise CommandError(
+                f'EXPLAIN для {connection.vendor} не поддерживается.')
+        problems = 0
+        for name, queryset in self.listings().items():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in plan.splitlines():
+                if full_scan.search(line):
+                    problems += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'  полный просмотр: {line.strip()}'))
+                elif TEMP_SORT.search(line):
+                    self.stdout.write(self.style.WARNING(
+                        f'  сортировка без индекса: {line.strip()}'))
+                else:
+                    self.stdout.write(f'  {line.strip()}')
+        if problems and options['strict']:
+            raise CommandError(f'Найдено полных просмотров: {problems}.')
+        if problems:
+            self.stdout.write(self.style.WARNING(
+                f'Найдено полных просмотров: {problems}.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Полных просмотров не найдено.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает ссылки на изображения записей и удаляет '
+            'файлы, на которые не ссылается ни одна запись.')
+
+    def handle(self, *args, **options):
+        removed = media.cleanup()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {removed}.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Создаёт недостающие миниатюры изображений всех записей '
+            'во всех размерах из реестра.')
+
+    def handle(self, *args, **options):
+        names = (Post.objects.exclude(image='').order_by()
+                 .values_list('image', flat=True).distinct())
+        count = 0
+        for name in names.iterator():
+            thumbnails.generate(name)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {count}.'))
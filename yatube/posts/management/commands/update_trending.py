@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинги изменившихся записей для ленты '
+            'популярного; запускается по расписанию.')
+
+    def handle(self, *args, **options):
+        changed = trending.update()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено строк рейтинга: {changed}.'))
@@ -0,0 +1,91 @@
+"""Учёт ссылок на файлы изображений и удаление ненужных файлов.
+
+Файл с адресацией по содержимому может принадлежать нескольким записям,
+поэтому он удаляется только тогда, когда на него не осталось ссылок:
+после удаления последней записи или замены в ней изображения.
+Вместе с файлом удаляются его миниатюры и варианты.
+"""
+import logging
+import os
+import time
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import Count
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import counters, variants
+from .consts import MEDIA_ORPHAN_AGE
+from .models import Post, StoredFile
+from .storage import post_storage
+
+# Каталоги внутри posts/, в которых лежат производные файлы.
+DERIVED_DIRS = {os.path.basename(variants.VARIANTS_DIR)}
+
+logger = logging.getLogger(__name__)
+
+
+def retain(name):
+    if name:
+        counters.add_file(name, 1)
+
+
+def release(name):
+    """Снимает ссылку на файл и удаляет его, если ссылок не осталось."""
+    if not name:
+        return
+    counters.add_file(name, -1)
+    if StoredFile.objects.filter(name=name, references=0).delete()[0]:
+        transaction.on_commit(lambda: _discard_unused(name))
+
+
+def _discard_unused(name):
+    # Пока транзакция фиксировалась, файл могли загрузить снова.
+    if not StoredFile.objects.filter(name=name).exists():
+        discard(name)
+
+
+def discard(name):
+    try:
+        delete_thumbnails(name, delete_file=False)
+        variants.remove(name)
+        post_storage.delete(name)
+    except (OSError, SuspiciousFileOperation):
+        logger.exception('Не удалось удалить файл %s', name)
+
+
+def _files(directory):
+    directories, files = post_storage.listdir(directory)
+    for file_name in files:
+        yield f'{directory}/{file_name}' if directory else file_name
+    for child in directories:
+        if not directory.count('/') and child in DERIVED_DIRS:
+            continue
+        yield from _files(f'{directory}/{child}' if directory else child)
+
+
+def cleanup(directory='posts'):
+    """Пересчитывает ссылки и удаляет файлы, на которые никто не ссылается.
+
+    Файлы моложе MEDIA_ORPHAN_AGE не трогаются: их может сохранять
+    запрос, транзакция которого ещё не зафиксирована.
+    """
+    references = dict(
+        Post.objects.exclude(image='').order_by()
+        .values_list('image').annotate(count=Count('pk')))
+    StoredFile.objects.exclude(name__in=references).delete()
+    for name, count in references.items():
+        StoredFile.objects.update_or_create(
+            name=name, defaults={'references': count})
+    if not post_storage.exists(directory):
+        return 0
+    removed = 0
+    threshold = time.time() - MEDIA_ORPHAN_AGE
+    for name in list(_files(directory)):
+        if name in references:
+            continue
+        if post_storage.get_modified_time(name).timestamp() > threshold:
+            continue
+        discard(name)
+        removed += 1
+    return removed
@@ -0,0 +1,86 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_comment_threads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentReaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', 'Нравится'), ('laugh', 'Смешно'), ('sad', 'Грустно')], max_length=16, verbose_name='Реакция')),
+                ('created', models.DateTimeField(auto_now=True, verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Реакция на комментарий',
+                'verbose_name_plural': 'Реакции на комментарии',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostReaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', 'Нравится'), ('laugh', 'Смешно'), ('sad', 'Грустно')], max_length=16, verbose_name='Реакция')),
+                ('created', models.DateTimeField(auto_now=True, verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Реакция на запись',
+                'verbose_name_plural': 'Реакции на записи',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReactionShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(max_length=32, verbose_name='Объект')),
+                ('kind', models.CharField(max_length=16, verbose_name='Реакция')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Часть')),
+                ('count', models.IntegerField(default=0, verbose_name='Число')),
+            ],
+            options={
+                'verbose_name': 'Часть счётчика реакций',
+                'verbose_name_plural': 'Части счётчиков реакций',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reactionshard',
+            constraint=models.UniqueConstraint(fields=('target', 'kind', 'shard'), name='unique_reaction_shard'),
+        ),
+        migrations.AddField(
+            model_name='postreaction',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Запись'),
+        ),
+        migrations.AddField(
+            model_name='postreaction',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='commentreaction',
+            name='comment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Comment', verbose_name='Комментарий'),
+        ),
+        migrations.AddField(
+            model_name='commentreaction',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddConstraint(
+            model_name='postreaction',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_post_reaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='commentreaction',
+            constraint=models.UniqueConstraint(fields=('user', 'comment'), name='unique_comment_reaction'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_view_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='posts.Post', verbose_name='Запись')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+                ('activity', models.FloatField(default=0, verbose_name='Активность')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг записи',
+                'verbose_name_plural': 'Рейтинги записей',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postscore',
+            index=models.Index(fields=['-score', '-post'], name='post_score_idx'),
+        ),
+    ]
@@ -0,0 +1,180 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:50
+
+from itertools import islice
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 0'"
+BATCH_SIZE = 500
+TEXT_WEIGHT = 2
+TERM_LENGTH = 64
+
+# Копия стеммера (posts/search/stemmer.py) на момент миграции: её
+# результат не должен меняться вместе с кодом приложения.
+VOWELS = 'аеиоуыэюя'
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]')
+
+PERFECTIVE_GERUND = re.compile(
+    r'(?:(?<=[ая])(?:вшись|вши|в)|ившись|ывшись|ивши|ывши|ив|ыв)$')
+REFLEXIVE = re.compile(r'(?:ся|сь)$')
+ADJECTIVAL = re.compile(
+    r'(?:(?:ивш|ывш|ующ)|(?<=[ая])(?:ем|нн|вш|ющ|щ))?'
+    r'(?:ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому'
+    r'|их|ых|ую|юю|ая|яя|ою|ею)$')
+VERB = re.compile(
+    r'(?:(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)'
+    r'|ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)$')
+NOUN = re.compile(
+    r'(?:а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием'
+    r'|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+SUPERLATIVE = re.compile(r'(?:ейше|ейш)$')
+DERIVATIONAL = re.compile(r'(?:ость|ост)$')
+
+
+def _region(word, start):
+    """Начало области после первой пары «гласная, согласная»."""
+    for position in range(start + 1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def _cut(pattern, word):
+    match = pattern.search(word)
+    if match is None:
+        return word, False
+    return word[:match.start()], True
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.search(word):
+        return word[:TERM_LENGTH]
+    start = next((position + 1 for position, letter in enumerate(word)
+                  if letter in VOWELS), len(word))
+    r2 = _region(word, _region(word, 0))
+    prefix, rv = word[:start], word[start:]
+
+    rv, found = _cut(PERFECTIVE_GERUND, rv)
+    if not found:
+        rv, _ = _cut(REFLEXIVE, rv)
+        for pattern in (ADJECTIVAL, VERB, NOUN):
+            rv, found = _cut(pattern, rv)
+            if found:
+                break
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    match = DERIVATIONAL.search(rv)
+    if match is not None and start + match.start() >= r2:
+        rv = rv[:match.start()]
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        rv, found = _cut(SUPERLATIVE, rv)
+        if found and rv.endswith('нн'):
+            rv = rv[:-1]
+        elif not found and rv.endswith('ь'):
+            rv = rv[:-1]
+    return (prefix + rv)[:TERM_LENGTH]
+
+
+def terms(text):
+    """Основы слов текста в порядке появления."""
+    return [stem(word) for word in WORD.findall(text)]
+
+
+def _weights(text, weight=1):
+    weights = {}
+    for term in terms(text):
+        weights[term] = weights.get(term, 0) + weight
+    return weights.items()
+
+
+def _batches(rows):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return
+        yield batch
+
+
+def split_documents(apps, schema_editor):
+    # Комментарии теперь индексируются отдельными строками, поэтому
+    # индекс строится заново.
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    posts = Post.objects.values_list('pk', 'text').iterator()
+    comments = Comment.objects.values_list('pk', 'post_id', 'text').iterator()
+    if schema_editor.connection.vendor != 'sqlite':
+        SearchTerm.objects.all().delete()
+        SearchTerm.objects.bulk_create(
+            (SearchTerm(post_id=pk, term=term, weight=weight)
+             for pk, text in posts
+             for term, weight in _weights(text, TEXT_WEIGHT)),
+            batch_size=BATCH_SIZE)
+        SearchTerm.objects.bulk_create(
+            (SearchTerm(post_id=post_id, comment_id=pk, term=term,
+                        weight=weight)
+             for pk, post_id, text in comments
+             for term, weight in _weights(text)),
+            batch_size=BATCH_SIZE)
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE posts_search USING fts5(text, {FTS_OPTIONS})')
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE posts_comment_search USING fts5('
+        f'text, post UNINDEXED, {FTS_OPTIONS})')
+    with schema_editor.connection.cursor() as cursor:
+        for batch in _batches(posts):
+            cursor.executemany(
+                'INSERT INTO posts_search (rowid, text) VALUES (%s, %s)',
+                [(pk, ' '.join(terms(text))) for pk, text in batch])
+        for batch in _batches(comments):
+            cursor.executemany(
+                'INSERT INTO posts_comment_search (rowid, post, text) '
+                'VALUES (%s, %s, %s)',
+                [(pk, post_id, ' '.join(terms(text)))
+                 for pk, post_id, text in batch])
+
+
+def merge_documents(apps, schema_editor):
+    # Старую схему заполняет команда rebuild_search.
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    SearchTerm.objects.filter(comment__isnull=False).delete()
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_comment_search')
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE posts_search USING fts5('
+            f'text, comments, {FTS_OPTIONS})')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_score'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='searchterm',
+            name='unique_search_term',
+        ),
+        migrations.AddField(
+            model_name='searchterm',
+            name='comment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Comment', verbose_name='Комментарий'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post', 'comment'), name='unique_search_term'),
+        ),
+        migrations.RunPython(split_documents, merge_documents),
+    ]
@@ -1,14 +1,34 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from .consts import SELF_TEXT_STR
+from .consts import (COMMENT_COLLAPSE_DEPTH, COMMENT_MAX_DEPTH,
+                     COMMENT_PATH_STEP, REACTION_KIND_LENGTH, REACTIONS,
+                     SEARCH_TERM_LENGTH, SELF_TEXT_STR)
+from .storage import post_storage
 
 User = get_user_model()
 
+# Поля, которые выводятся в карточке записи в лентах.
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'updated',
+    'image',
+    'image_variants',
+    'comment_count',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__slug',
+    'group__title',
+)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
     description = models.TextField()
+    post_count = models.PositiveIntegerField(
+        'Число записей', default=0, editable=False)
 
     def __str__(self):
         return self.title
@@ -18,11 +38,34 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+def followed_by(viewer, author='author'):
+    """Выражение «посетитель подписан на автора» для annotate()."""
+    if not viewer.is_authenticated:
+        return models.Value(False, output_field=models.BooleanField())
+    return models.Exists(Follow.objects.filter(
+        user=viewer.pk, author=models.OuterRef(author)))
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Записи для лент вместе с автором и группой одним запросом."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def with_follow_state(self, viewer):
+        """Добавляет author_followed: подписан ли посетитель на автора.
+
+        Состояние всей страницы приходит в том же запросе, что и записи.
+        """
+        return self.annotate(author_followed=followed_by(viewer))
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста',
                             help_text='Введите текст поста')
     pub_date = models.DateTimeField(verbose_name='Дата публикации',
                                     auto_now_add=True)
+    updated = models.DateTimeField(verbose_name='Дата изменения',
+                                   auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -41,8 +84,20 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_storage,
         blank=True
     )
+    # JSON с уменьшенными копиями изображения в современных форматах,
+    # заполняется фоновой обработкой (posts/variants.py).
+    image_variants = models.TextField(
+        'Варианты изображения', blank=True, default='', editable=False)
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев', default=0, editable=False)
+    # Пишется пачками из буфера в памяти процесса (posts/buffer.py).
+    view_count = models.PositiveIntegerField(
+        'Число просмотров', default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:SELF_TEXT_STR]
@@ -51,6 +106,13 @@ class Post(models.Model):
         ordering = ('-pub_date', )
         verbose_name = 'Запись'
         verbose_name_plural = 'Записи'
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'), name='post_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_date_idx'),
+        )
 
 
 class Comment(models.Model):
@@ -68,10 +130,39 @@ class Comment(models.Model):
                             help_text='Введите текст комментария')
     created = models.DateTimeField(verbose_name='Дата публикации',
                                    auto_now_add=True)
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        editable=False,
+        verbose_name='Ответ на')
+    # Идентификаторы предков и самого комментария (posts/threads.py):
+    # сортировка по пути выводит ветки в порядке обхода дерева.
+    path = models.CharField(
+        'Путь', max_length=COMMENT_PATH_STEP * COMMENT_MAX_DEPTH,
+        default='', editable=False)
+    depth = models.PositiveSmallIntegerField(
+        'Глубина', default=0, editable=False)
+    reply_count = models.PositiveIntegerField(
+        'Число ответов в ветке', default=0, editable=False)
+
+    @property
+    def collapsed(self):
+        """Ответы на комментарий не выводятся в общей ветке."""
+        return self.depth == COMMENT_COLLAPSE_DEPTH - 1 and self.reply_count
 
     class Meta:
+        ordering = ('path', 'id')
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(fields=('post', 'created'),
+                         name='comment_post_created_idx'),
+            models.Index(fields=('post', 'path'),
+                         name='comment_post_path_idx'),
+        )
 
 
 class Follow(models.Model):
@@ -89,3 +180,184 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_follow'),
+        )
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Запись')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_timeline_entry'),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-id'),
+                         name='timeline_user_feed_idx'),
+        )
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь')
+    post_count = models.PositiveIntegerField('Число записей', default=0)
+    follower_count = models.PositiveIntegerField('Число подписчиков',
+                                                 default=0)
+    following_count = models.PositiveIntegerField('Число подписок',
+                                                  default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class SearchTerm(models.Model):
+    """Строка обратного индекса для баз без полнотекстового поиска.
+
+    Основы текста записи хранятся с пустым comment, основы каждого
+    комментария — отдельными строками с его идентификатором.
+    """
+    term = models.CharField('Основа слова', max_length=SEARCH_TERM_LENGTH)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Запись')
+    comment = models.ForeignKey(
+        Comment,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Комментарий')
+    weight = models.PositiveIntegerField('Вес', default=0)
+
+    class Meta:
+        verbose_name = 'Термин поиска'
+        verbose_name_plural = 'Термины поиска'
+        constraints = (
+            models.UniqueConstraint(fields=('term', 'post', 'comment'),
+                                    name='unique_search_term'),
+        )
+
+
+class StoredFile(models.Model):
+    """Число записей, ссылающихся на файл изображения."""
+    name = models.CharField('Имя файла', max_length=255, primary_key=True)
+    references = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+
+class Reaction(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пользователь')
+    kind = models.CharField('Реакция', max_length=REACTION_KIND_LENGTH,
+                            choices=REACTIONS)
+    created = models.DateTimeField('Дата', auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class PostReaction(Reaction):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Запись')
+
+    class Meta:
+        verbose_name = 'Реакция на запись'
+        verbose_name_plural = 'Реакции на записи'
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_post_reaction'),
+        )
+
+
+class CommentReaction(Reaction):
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Комментарий')
+
+    class Meta:
+        verbose_name = 'Реакция на комментарий'
+        verbose_name_plural = 'Реакции на комментарии'
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'comment'),
+                                    name='unique_comment_reaction'),
+        )
+
+
+class ReactionShard(models.Model):
+    """Часть счётчика реакций одного вида на запись или комментарий.
+
+    Отдельные части могут уйти в минус, сумма по ним всегда верна.
+    """
+    target = models.CharField('Объект', max_length=32)
+    kind = models.CharField('Реакция', max_length=REACTION_KIND_LENGTH)
+    shard = models.PositiveSmallIntegerField('Часть')
+    count = models.IntegerField('Число', default=0)
+
+    class Meta:
+        verbose_name = 'Часть счётчика реакций'
+        verbose_name_plural = 'Части счётчиков реакций'
+        constraints = (
+            models.UniqueConstraint(fields=('target', 'kind', 'shard'),
+                                    name='unique_reaction_shard'),
+        )
+
+
+class PostScore(models.Model):
+    """Рейтинг записи в ленте популярного, пересчитывается заданием
+    update_trending."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Запись')
+    score = models.FloatField('Рейтинг')
+    # Активность, по которой посчитан рейтинг: неизменившиеся записи
+    # не перезаписываются.
+    activity = models.FloatField('Активность', default=0)
+
+    class Meta:
+        verbose_name = 'Рейтинг записи'
+        verbose_name_plural = 'Рейтинги записей'
+        indexes = (
+            models.Index(fields=('-score', '-post'), name='post_score_idx'),
+        )
@@ -0,0 +1,97 @@
+"""Кэш целых страниц лент для анонимных посетителей.
+
+Ключ страницы включает поколения её лент, путь и те параметры запроса,
+от которых зависит страница (курсор, номер страницы, ответ),
+в том виде, в каком их понимает представление; остальные параметры
+не плодят копий одной страницы в кэше. Новая запись или комментарий
+делают закэшированную страницу неактуальной без явной очистки.
+Повторный запрос той же страницы не рендерит шаблон и не вызывает
+контекстные процессоры.
+
+Части страницы, которые зависят от посетителя или от текущего момента
+(шапка, подвал), помечаются в шаблоне тегом {% hole %} и при выдаче
+из кэша рендерятся заново. Страницы с токеном CSRF не кэшируются.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from . import generations
+from .consts import PAGE_CACHE_TIMEOUT
+from .paginators import page_number
+
+HOLE_START = '<!--hole:{}-->'
+HOLE_END = '<!--/hole-->'
+HOLE_RE = re.compile(r'<!--hole:(?P<name>[\w/.-]+)-->.*?<!--/hole-->', re.S)
+KEY = 'page:{}'
+
+
+def _cacheable(request):
+    # Сессия и сообщения бывают только у посетителей с cookie,
+    # а для остальных страница одинакова.
+    return (request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and 'messages' not in request.COOKIES)
+
+
+def reply_to(request):
+    """Комментарий, на который отвечают, из ?reply=N."""
+    reply = request.GET.get('reply', '')
+    return reply if reply.isdigit() else ''
+
+
+def _key(names, request):
+    # Курсор важнее номера страницы, как в CursorPaginator.get_page.
+    cursor = request.GET.get('cursor', '')
+    page = '' if cursor else page_number(request.GET.get('page'))
+    value = (f'{",".join(names)}|{generations.version(*names)}|'
+             f'{request.path}|{cursor}|{page}|{reply_to(request)}')
+    return KEY.format(hashlib.md5(value.encode()).hexdigest())
+
+
+def fill_holes(content, request):
+    """Рендерит помеченные фрагменты страницы для текущего запроса."""
+    return HOLE_RE.sub(
+        lambda match: render_to_string(match['name'], request=request),
+        content)
+
+
+def _unmark(match):
+    # Свежая страница уже отрендерена для этого запроса.
+    return match.group(0)[
+        len(HOLE_START.format(match['name'])):-len(HOLE_END)]
+
+
+def anonymous_page(feeds, timeout=PAGE_CACHE_TIMEOUT):
+    """Кэширует страницу анонимного посетителя по поколениям лент."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view(request, *args, **kwargs)
+            names = feeds(request, *args, **kwargs)
+            if not names:
+                return view(request, *args, **kwargs)
+            key = _key(names, request)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(fill_holes(content, request),
+                                    content_type=content_type)
+            request.page_holes = True
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            content = response.content.decode(response.charset)
+            if (not request.META.get('CSRF_COOKIE_USED')
+                    and not response.cookies):
+                cache.set(key, (content, response['Content-Type']), timeout)
+            response.content = HOLE_RE.sub(_unmark, content)
+            return response
+        return wrapper
+    return decorator
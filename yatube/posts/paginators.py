@@ -0,0 +1,193 @@
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+from .consts import PAGINATOR_CONST, PAGINATOR_OFFSET_PAGES
+
+FEED_KEYS = ('-pub_date', '-id')
+COMMENT_KEYS = ('path', 'id')
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class InvalidCursor(ValueError):
+    """Курсор из запроса повреждён или подделан."""
+
+
+def page_number(number):
+    """Номер страницы из ?page=N; вне 1..PAGINATOR_OFFSET_PAGES — 1."""
+    try:
+        number = int(number)
+    except (TypeError, ValueError):
+        return 1
+    if not 1 <= number <= PAGINATOR_OFFSET_PAGES:
+        return 1
+    return number
+
+
+class CursorEncoder(json.JSONEncoder):
+    """Сохраняет даты в курсоре без потери микросекунд."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки (keyset pagination).
+
+    Страница выбирается условием на ключ последней показанной записи,
+    поэтому дальние страницы стоят столько же, сколько первая, и общее
+    количество записей (COUNT) не запрашивается. Номер страницы
+    переносится в курсоре и нужен только для отображения.
+    """
+
+    def __init__(self, object_list, per_page, keys=FEED_KEYS):
+        self.keys = keys
+        self._num_pages = 1
+        super().__init__(object_list.order_by(*keys), per_page)
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def get_page(self, cursor=None, number=None, strict=False):
+        """Страница по курсору или номеру.
+
+        Повреждённый курсор открывает первую страницу, а при strict
+        пробрасывает InvalidCursor.
+        """
+        try:
+            decoded = self.decode(cursor)
+        except InvalidCursor:
+            if strict:
+                raise
+            return self._offset_page(1)
+        if decoded is None:
+            return self._offset_page(page_number(number))
+        direction, values, number = decoded
+        if direction == BACKWARD:
+            return self._backward_page(values, number)
+        return self._forward_page(values, number)
+
+    def encode(self, direction, obj, number):
+        values = [self._value(obj, key.lstrip('-')) for key in self.keys]
+        data = json.dumps([direction, values, number], cls=CursorEncoder)
+        return base64.urlsafe_b64encode(
+            data.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        """Направление, значения ключа и номер страницы из курсора.
+
+        Значения разбираются полями модели, поэтому подделанный курсор
+        не доходит до запроса; в этом случае — InvalidCursor.
+        """
+        if not cursor:
+            return None
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values, number = json.loads(data)
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if (direction not in (FORWARD, BACKWARD)
+                or not isinstance(values, list)
+                or len(values) != len(self.keys)
+                or type(number) is not int or number < 1):
+            raise InvalidCursor(cursor)
+        return direction, [
+            self._parse(key.lstrip('-'), value)
+            for key, value in zip(self.keys, values)], number
+
+    def _parse(self, path, value):
+        model = self.object_list.model
+        *relations, name = path.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        if type(value) not in (str, int, float):
+            raise InvalidCursor(value)
+        try:
+            value = model._meta.get_field(name).to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(value)
+        if value is None:
+            raise InvalidCursor(value)
+        return value
+
+    @staticmethod
+    def _value(obj, path):
+        for attr in path.split('__'):
+            obj = getattr(obj, attr)
+        return obj
+
+    def _seek(self, values, backward):
+        """Условие «после ключа» с учётом направления каждого поля."""
+        conditions = []
+        for position, key in enumerate(self.keys):
+            descending = key.startswith('-')
+            lookup = 'lt' if descending != backward else 'gt'
+            condition = {
+                previous.lstrip('-'): value
+                for previous, value in zip(self.keys[:position], values)
+            }
+            condition[f'{key.lstrip("-")}__{lookup}'] = values[position]
+            conditions.append(Q(**condition))
+        return reduce(or_, conditions)
+
+    def _reversed_keys(self):
+        return [key[1:] if key.startswith('-') else f'-{key}'
+                for key in self.keys]
+
+    def _forward_page(self, values, number):
+        rows = list(self.object_list.filter(
+            self._seek(values, backward=False))[:self.per_page + 1])
+        return self._build(rows, number)
+
+    def _backward_page(self, values, number):
+        rows = list(self.object_list.filter(
+            self._seek(values, backward=True)
+        ).order_by(*self._reversed_keys())[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not has_previous:
+            number = 1
+        self._num_pages = number + 1
+        return self._page(rows, number)
+
+    def _offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            return self._offset_page(1)
+        return self._build(rows, number)
+
+    def _build(self, rows, number):
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        self._num_pages = number + 1 if has_next else number
+        return self._page(rows, number)
+
+    def _page(self, rows, number):
+        page = Page(rows, number, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if rows and page.has_next():
+            page.next_cursor = self.encode(FORWARD, rows[-1], number + 1)
+        if rows and page.has_previous():
+            page.previous_cursor = self.encode(BACKWARD, rows[0], number - 1)
+        return page
+
+
+def paginate(request, queryset, keys=FEED_KEYS, per_page=PAGINATOR_CONST,
+             strict=False):
+    """Возвращает страницу ленты по курсору или номеру из запроса."""
+    paginator = CursorPaginator(queryset, per_page, keys)
+    return paginator.get_page(request.GET.get('cursor'),
+                              request.GET.get('page'), strict)
@@ -0,0 +1,120 @@
+"""Реакции на записи и комментарии.
+
+Реакция пользователя на объект хранится одной строкой с уникальным
+ключом (пользователь, объект), поэтому повторная отправка формы ничего
+не меняет. Счётчики разделены на REACTION_SHARDS строк: каждое изменение
+увеличивает случайную часть, а число реакций — сумма частей. Так
+одновременные реакции на популярную запись не ждут блокировку одной
+строки. Счётчики и реакции посетителя для страницы ленты загружаются
+по запросу на каждое.
+"""
+import random
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from . import generations
+from .consts import REACTION_BATCH_SIZE, REACTION_SHARDS, REACTIONS
+from .models import (Comment, CommentReaction, Post, PostReaction,
+                     ReactionShard)
+
+KINDS = dict(REACTIONS)
+
+
+def target(obj):
+    return f'{obj._meta.model_name}:{obj.pk}'
+
+
+def _reactions(obj):
+    if isinstance(obj, Comment):
+        return CommentReaction, 'comment'
+    return PostReaction, 'post'
+
+
+def _add(key, kind, delta):
+    shard = random.randrange(REACTION_SHARDS)
+    shards = ReactionShard.objects.filter(target=key, kind=kind, shard=shard)
+    if not shards.update(count=F('count') + delta):
+        ReactionShard.objects.get_or_create(target=key, kind=kind,
+                                            shard=shard)
+        shards.update(count=F('count') + delta)
+
+
+def _changed(obj):
+    post = obj if isinstance(obj, Post) else obj.post
+    generations.bump(*generations.post_feeds(post))
+
+
+def react(user, obj, kind):
+    """Ставит реакцию kind; повторная такая же реакция снимает её."""
+    model, field = _reactions(obj)
+    key = target(obj)
+    with transaction.atomic():
+        reaction, created = model.objects.select_for_update().get_or_create(
+            user=user, **{field: obj}, defaults={'kind': kind})
+        if created:
+            _add(key, kind, 1)
+        elif reaction.kind == kind:
+            reaction.delete()
+            _add(key, kind, -1)
+        else:
+            _add(key, reaction.kind, -1)
+            _add(key, kind, 1)
+            reaction.kind = kind
+            reaction.save(update_fields=('kind', 'created'))
+    _changed(obj)
+
+
+def remove(obj):
+    """Удаляет счётчики удалённого объекта."""
+    ReactionShard.objects.filter(target=target(obj)).delete()
+
+
+def remove_comments(comment_ids):
+    """Удаляет счётчики комментариев удалённой записи."""
+    comment_ids = list(comment_ids)
+    for start in range(0, len(comment_ids), REACTION_BATCH_SIZE):
+        ReactionShard.objects.filter(target__in=[
+            f'comment:{pk}'
+            for pk in comment_ids[start:start + REACTION_BATCH_SIZE]
+        ]).delete()
+
+
+def annotate(objects, user):
+    """Добавляет объектам счётчики реакций и реакцию посетителя.
+
+    Счётчики всех объектов загружаются одним запросом, реакции
+    посетителя — ещё одним.
+    """
+    objects = list(objects)
+    if not objects:
+        return objects
+    counts = defaultdict(dict)
+    rows = (ReactionShard.objects
+            .filter(target__in=[target(obj) for obj in objects])
+            .values('target', 'kind').annotate(total=Sum('count'))
+            .order_by())
+    for row in rows:
+        counts[row['target']][row['kind']] = row['total']
+    mine = {}
+    if user.is_authenticated:
+        model, field = _reactions(objects[0])
+        mine = dict(model.objects.filter(
+            user=user, **{f'{field}__in': [obj.pk for obj in objects]}
+        ).values_list(f'{field}_id', 'kind'))
+    for obj in objects:
+        obj.my_reaction = mine.get(obj.pk)
+        obj.reactions = [
+            {'kind': kind, 'label': label,
+             'count': counts[target(obj)].get(kind, 0),
+             'mine': kind == obj.my_reaction}
+            for kind, label in REACTIONS
+        ]
+    return objects
+
+
+def viewer_key(objects):
+    """Часть ключа кэша страницы, зависящая от реакций посетителя."""
+    return ','.join(f'{obj.pk}:{obj.my_reaction}' for obj in objects
+                    if getattr(obj, 'my_reaction', None))
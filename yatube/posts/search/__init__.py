@@ -0,0 +1,8 @@
+"""Полнотекстовый поиск по записям и комментариям."""
+from .index import (find, index_comment, index_post, rebuild, remove_comment,
+                    remove_post)
+
+__all__ = [
+    'find', 'index_comment', 'index_post', 'rebuild', 'remove_comment',
+    'remove_post',
+]
@@ -0,0 +1,221 @@
+"""Обратный индекс записей и их комментариев.
+
+На SQLite индекс хранится в виртуальных таблицах FTS5 и ранжируется
+функцией bm25. На остальных базах используется таблица SearchTerm
+с весом каждой основы в документе, ранг считается как сумма весов
+основ запроса, умноженных на их обратную частоту (tf-idf).
+В обоих случаях в индекс попадают основы слов после стеммера, поэтому
+запрос «записями» находит запись со словом «записи».
+
+Текст записи и каждый комментарий индексируются отдельными строками:
+новый или удалённый комментарий меняет только свою строку, а не
+переиндексирует всю ветку.
+"""
+import math
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import (Case, Count, F, FloatField, IntegerField, Max,
+                              Q, Sum, When)
+
+from ..consts import (SEARCH_BATCH_SIZE, SEARCH_LIMIT, SEARCH_PREFIX_LENGTH,
+                      SEARCH_TEXT_WEIGHT)
+from ..models import Comment, Post, SearchTerm
+from .stemmer import terms
+
+FTS_TABLE = 'posts_search'
+FTS_COMMENTS = 'posts_comment_search'
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def _weights(text, weight=1):
+    weights = Counter()
+    for term in terms(text):
+        weights[term] += weight
+    return weights
+
+
+def _store_posts(posts):
+    """Индексирует тексты записей: пары (идентификатор, текст)."""
+    post_ids = [pk for pk, _ in posts]
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in post_ids])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [(pk, ' '.join(terms(text))) for pk, text in posts])
+        return
+    SearchTerm.objects.filter(post_id__in=post_ids,
+                              comment__isnull=True).delete()
+    SearchTerm.objects.bulk_create(
+        (SearchTerm(post_id=pk, term=term, weight=weight)
+         for pk, text in posts
+         for term, weight in _weights(text, SEARCH_TEXT_WEIGHT).items()),
+        batch_size=SEARCH_BATCH_SIZE)
+
+
+def _store_comments(comments):
+    """Индексирует новые комментарии: (идентификатор, запись, текст)."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_COMMENTS} (rowid, post, text) '
+                f'VALUES (%s, %s, %s)',
+                [(pk, post_id, ' '.join(terms(text)))
+                 for pk, post_id, text in comments])
+        return
+    SearchTerm.objects.bulk_create(
+        (SearchTerm(post_id=post_id, comment_id=pk, term=term, weight=weight)
+         for pk, post_id, text in comments
+         for term, weight in _weights(text).items()),
+        batch_size=SEARCH_BATCH_SIZE)
+
+
+def _delete_fts(table, ids):
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {table} WHERE rowid = %s',
+                           [(pk,) for pk in ids])
+
+
+def index_post(post_id):
+    """Переиндексирует текст записи после её изменения."""
+    _store_posts(list(Post.objects.filter(pk=post_id)
+                      .values_list('pk', 'text')))
+
+
+def index_comment(comment):
+    _store_comments([(comment.pk, comment.post_id, comment.text)])
+
+
+def remove_comment(comment_id):
+    if uses_fts():
+        _delete_fts(FTS_COMMENTS, [comment_id])
+    # Строки SearchTerm удаляются каскадно вместе с комментарием.
+
+
+def remove_post(post_id, comment_ids=()):
+    """Убирает из индекса запись и её комментарии comment_ids."""
+    if uses_fts():
+        _delete_fts(FTS_TABLE, [post_id])
+        _delete_fts(FTS_COMMENTS, comment_ids)
+    # Строки SearchTerm удаляются каскадно вместе с записью.
+
+
+def _batches(queryset, *fields):
+    rows = queryset.order_by('pk').values_list('pk', *fields)
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last)[:SEARCH_BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][0]
+
+
+def rebuild():
+    """Строит индекс заново по всем записям и комментариям."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(f'DELETE FROM {FTS_COMMENTS}')
+    else:
+        SearchTerm.objects.all().delete()
+    count = 0
+    for batch in _batches(Post.objects.all(), 'text'):
+        _store_posts(batch)
+        count += len(batch)
+    for batch in _batches(Comment.objects.all(), 'post_id', 'text'):
+        _store_comments(batch)
+    return count
+
+
+def _query_terms(query):
+    return list(dict.fromkeys(term for term in terms(query) if term))
+
+
+def _fts_pattern(term):
+    if len(term) >= SEARCH_PREFIX_LENGTH:
+        return f'"{term}"*'
+    return f'"{term}"'
+
+
+def _fts_find(query_terms, limit):
+    # Документы с любым словом запроса дают вклад в ранг записи,
+    # а в выдачу попадают записи, где каждое слово есть в тексте
+    # или хотя бы в одном комментарии.
+    patterns = [_fts_pattern(term) for term in query_terms]
+    has_term = (
+        f'post IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        f'UNION SELECT post FROM {FTS_COMMENTS} '
+        f'WHERE {FTS_COMMENTS} MATCH %s)')
+    any_term = ' OR '.join(patterns)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT post FROM ('
+            f'SELECT rowid AS post, '
+            f'bm25({FTS_TABLE}) * {SEARCH_TEXT_WEIGHT} AS rank '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'UNION ALL SELECT post, bm25({FTS_COMMENTS}) AS rank '
+            f'FROM {FTS_COMMENTS} WHERE {FTS_COMMENTS} MATCH %s) '
+            f'WHERE {" AND ".join([has_term] * len(patterns))} '
+            f'GROUP BY post ORDER BY SUM(rank), post DESC LIMIT %s',
+            [any_term, any_term,
+             *(pattern for pattern in patterns for _ in range(2)), limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _term_filter(term):
+    if len(term) >= SEARCH_PREFIX_LENGTH:
+        return Q(term__startswith=term)
+    return Q(term=term)
+
+
+def _table_find(query_terms, limit):
+    filters = [_term_filter(term) for term in query_terms]
+    rows = SearchTerm.objects.filter(reduce(or_, filters))
+    total = Post.objects.count()
+    frequencies = rows.aggregate(**{
+        str(position): Count('post', filter=condition, distinct=True)
+        for position, condition in enumerate(filters)
+    })
+    idf = [math.log(1 + total / (frequencies[str(position)] or 1))
+           for position in range(len(filters))]
+    matched = [
+        Max(Case(When(condition, then=1), default=0,
+                 output_field=IntegerField()))
+        for condition in filters
+    ]
+    score = [
+        Sum(Case(When(condition, then=F('weight') * weight), default=0,
+                 output_field=FloatField()))
+        for condition, weight in zip(filters, idf)
+    ]
+    return list(
+        rows.values('post')
+        .annotate(matched=sum(matched[1:], matched[0]),
+                  score=sum(score[1:], score[0]))
+        .filter(matched=len(filters))
+        .order_by('-score', '-post')
+        .values_list('post', flat=True)[:limit]
+    )
+
+
+def find(query, limit=SEARCH_LIMIT):
+    """Идентификаторы записей, подходящих под запрос, от лучших к худшим.
+
+    Запись подходит, если в ней или её комментариях есть все слова
+    запроса; основы длиннее SEARCH_PREFIX_LENGTH ищутся по префиксу.
+    """
+    query_terms = _query_terms(query)
+    if not query_terms:
+        return []
+    if uses_fts():
+        return _fts_find(query_terms, limit)
+    return _table_find(query_terms, limit)
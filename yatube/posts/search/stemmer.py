@@ -0,0 +1,82 @@
+"""Стеммер для русского языка по алгоритму Snowball (Портера).
+
+Слова приводятся к основе, чтобы «записи», «запись» и «записью»
+находились по одному запросу. Слова не на кириллице только
+приводятся к нижнему регистру.
+"""
+import re
+
+from ..consts import SEARCH_TERM_LENGTH
+
+VOWELS = 'аеиоуыэюя'
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]')
+
+PERFECTIVE_GERUND = re.compile(
+    r'(?:(?<=[ая])(?:вшись|вши|в)|ившись|ывшись|ивши|ывши|ив|ыв)$')
+REFLEXIVE = re.compile(r'(?:ся|сь)$')
+ADJECTIVAL = re.compile(
+    r'(?:(?:ивш|ывш|ующ)|(?<=[ая])(?:ем|нн|вш|ющ|щ))?'
+    r'(?:ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому'
+    r'|их|ых|ую|юю|ая|яя|ою|ею)$')
+VERB = re.compile(
+    r'(?:(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)'
+    r'|ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)$')
+NOUN = re.compile(
+    r'(?:а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием'
+    r'|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+SUPERLATIVE = re.compile(r'(?:ейше|ейш)$')
+DERIVATIONAL = re.compile(r'(?:ость|ост)$')
+
+
+def _region(word, start):
+    """Начало области после первой пары «гласная, согласная»."""
+    for position in range(start + 1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def _cut(pattern, word):
+    match = pattern.search(word)
+    if match is None:
+        return word, False
+    return word[:match.start()], True
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.search(word):
+        return word[:SEARCH_TERM_LENGTH]
+    start = next((position + 1 for position, letter in enumerate(word)
+                  if letter in VOWELS), len(word))
+    r2 = _region(word, _region(word, 0))
+    prefix, rv = word[:start], word[start:]
+
+    rv, found = _cut(PERFECTIVE_GERUND, rv)
+    if not found:
+        rv, _ = _cut(REFLEXIVE, rv)
+        for pattern in (ADJECTIVAL, VERB, NOUN):
+            rv, found = _cut(pattern, rv)
+            if found:
+                break
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    match = DERIVATIONAL.search(rv)
+    if match is not None and start + match.start() >= r2:
+        rv = rv[:match.start()]
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        rv, found = _cut(SUPERLATIVE, rv)
+        if found and rv.endswith('нн'):
+            rv = rv[:-1]
+        elif not found and rv.endswith('ь'):
+            rv = rv[:-1]
+    return (prefix + rv)[:SEARCH_TERM_LENGTH]
+
+
+def terms(text):
+    """Основы слов текста в порядке появления."""
+    return [stem(word) for word in WORD.findall(text)]
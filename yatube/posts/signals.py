@@ -0,0 +1,191 @@
+import threading
+
+from django.core.signals import request_finished
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import (buffer, counters, generations, graph, media, reactions,
+               search, threads, thumbnails, timeline)
+from .conditional import forget_field
+from .consts import TIMELINE_FANOUT_LIMIT
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Комментарии удаляемых записей: их обработчики не выполняются,
+# индекс и счётчики реакций убираются один раз в post_deleted.
+_deleting = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = {}
+    return _deleting.posts
+
+
+@receiver(request_finished)
+def request_done(sender, **kwargs):
+    buffer.maybe_flush()
+
+
+def _saved_value(instance, field, raw, using):
+    # Прежнее значение уникального поля: по нему запомнен
+    # идентификатор в cached_field.
+    if not instance.pk or raw:
+        return None
+    return type(instance).objects.using(using).filter(
+        pk=instance.pk).values_list(field, flat=True).first()
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, using=None, **kwargs):
+    instance._saved_username = _saved_value(instance, 'username', raw,
+                                            using)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    forget_field(User, 'username', instance.username,
+                 getattr(instance, '_saved_username', None))
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_field(User, 'username', instance.username)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, using=None, **kwargs):
+    instance._saved_group_id = None
+    instance._saved_image = None
+    instance._image_replaced = False
+    if instance.pk and not raw:
+        # Прежние значения читаются из базы, в которую идёт запись:
+        # реплика может отставать.
+        instance._saved_group_id, instance._saved_image = (
+            Post.objects.using(using).filter(pk=instance.pk)
+            .values_list('group_id', 'image').first() or (None, None))
+        if instance.image.name != instance._saved_image:
+            # Варианты прежнего изображения не должны попасть в srcset
+            # нового, пока фоновая обработка не построит новые.
+            instance.image_variants = ''
+            instance._image_replaced = True
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.add_user(instance.author_id, 'post_count', 1)
+        counters.add_group(instance.group_id, 1)
+        timeline.fan_out(instance)
+    elif instance._saved_group_id != instance.group_id:
+        counters.add_group(instance._saved_group_id, -1)
+        counters.add_group(instance.group_id, 1)
+    search.index_post(instance.pk)
+    if instance.image.name != instance._saved_image:
+        media.retain(instance.image.name)
+        media.release(instance._saved_image)
+    if instance.image.name != instance._saved_image or (
+            instance._image_replaced):
+        thumbnails.schedule(instance.image)
+    generations.bump(*generations.post_feeds(
+        instance, [instance._saved_group_id]))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    _deleting_posts()[instance.pk] = list(
+        Comment.objects.filter(post=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    comment_ids = _deleting_posts().pop(instance.pk, ())
+    counters.add_user(instance.author_id, 'post_count', -1)
+    counters.add_group(instance.group_id, -1)
+    search.remove_post(instance.pk, comment_ids)
+    reactions.remove(instance)
+    reactions.remove_comments(comment_ids)
+    media.release(instance.image.name)
+    forget_field(Post, 'pk', instance.pk, field='author_id')
+    generations.bump(*generations.post_feeds(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        threads.place(instance)
+        counters.add_comment(instance.post_id, 1)
+        search.index_comment(instance)
+        generations.bump(*generations.post_feeds(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in _deleting_posts():
+        return
+    threads.remove(instance)
+    reactions.remove(instance)
+    search.remove_comment(instance.pk)
+    counters.add_comment(instance.post_id, -1)
+    post = Post.objects.filter(pk=instance.post_id).only(
+        'author_id', 'group_id').first()
+    if post is not None:
+        generations.bump(*generations.post_feeds(post))
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, raw=False, using=None, **kwargs):
+    instance._saved_slug = _saved_value(instance, 'slug', raw, using)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    forget_field(Group, 'slug', instance.slug,
+                 getattr(instance, '_saved_slug', None))
+    if created or raw:
+        return
+    # Название группы выводится в карточках её записей.
+    Post.objects.filter(group=instance).update(updated=timezone.now())
+    generations.bump(generations.GROUPS, generations.group(instance.pk))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    Post.objects.filter(group=instance).update(updated=timezone.now())
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    forget_field(Group, 'slug', instance.slug)
+    generations.bump(generations.GROUPS, generations.group(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    counters.add_user(instance.author_id, 'follower_count', 1)
+    counters.add_user(instance.user_id, 'following_count', 1)
+    graph.changed(instance.user_id, instance.author_id)
+    if not timeline.is_celebrity(instance.author_id):
+        timeline.backfill(instance.user_id, instance.author_id)
+    generations.bump(generations.timeline(instance.user_id),
+                     generations.author(instance.author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.add_user(instance.author_id, 'follower_count', -1)
+    counters.add_user(instance.user_id, 'following_count', -1)
+    graph.changed(instance.user_id, instance.author_id)
+    timeline.drop(instance.user_id, instance.author_id)
+    if timeline.follower_count(
+            instance.author_id) == TIMELINE_FANOUT_LIMIT - 1:
+        timeline.backfill_followers(instance.author_id)
+    generations.bump(generations.timeline(instance.user_id),
+                     generations.author(instance.author_id))
@@ -0,0 +1,42 @@
+"""Хранилище изображений записей с адресацией по содержимому.
+
+Файл сохраняется под именем из SHA-256 своего содержимого, поэтому
+одно и то же изображение, загруженное к нескольким записям, лежит
+на диске один раз, а его миниатюры создаются один раз. Сколько записей
+ссылаются на файл, хранится в StoredFile (posts/media.py).
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], f'{digest}{extension}')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        saved = self._save(name, content)
+        if saved != name:
+            # Такой же файл одновременно сохранил другой запрос.
+            self.delete(saved)
+        return name
+
+
+post_storage = ContentAddressedStorage()
@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.pagecache import HOLE_END, HOLE_START
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name):
+    """Включает шаблон, который страничный кэш рендерит заново
+    для каждого запроса."""
+    content = context.template.engine.get_template(template_name).render(
+        context)
+    if getattr(context.get('request'), 'page_holes', False):
+        content = (HOLE_START.format(template_name) + content + HOLE_END)
+    return mark_safe(content)
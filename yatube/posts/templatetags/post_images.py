@@ -0,0 +1,22 @@
+from django import template
+
+from posts import thumbnails, variants
+from posts.consts import IMAGE_GEOMETRIES
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, size):
+    """Изображение записи с источниками srcset или заглушка, пока
+    миниатюры нет."""
+    width, height = IMAGE_GEOMETRIES[size][0].split('x')
+    thumbnail = thumbnails.ready(post.image, size)
+    return {
+        'image': post.image,
+        'thumbnail': thumbnail,
+        'sources': variants.sources(post, size) if thumbnail else [],
+        'sizes': f'(max-width: {width}px) 100vw, {width}px',
+        'width': width,
+        'height': height,
+    }
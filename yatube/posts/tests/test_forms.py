@@ -1,5 +1,11 @@
 import shutil
+import struct
 import tempfile
+import zlib
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
 
 from ..models import Post, Group, User, Comment
 from django.test import Client, TestCase, override_settings
@@ -100,6 +106,17 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.count(), post_count)
         self.assertTrue(Post.objects.first())
 
+    def test_new_image_resets_variants(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            image_variants='{"card": {}}')
+        self.authorized_client_author.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': POST_TEXT, 'image': self.image},
+        )
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.image)
+        self.assertEqual(self.post.image_variants, '')
+
     def test_form_post_edit_guest(self):
         post_count = Post.objects.count()
         form_data = {
@@ -185,3 +202,57 @@ class PostFormTests(TestCase):
         self.assertRedirects(response,
                              reverse('posts:post_detail',
                                      kwargs={'post_id': self.post.pk}))
+
+    @mock.patch('posts.uploads.IMAGE_MAX_SIZE', 10)
+    def test_form_image_too_large(self):
+        post_count = Post.objects.count()
+        response = self.authorized_client_author.post(
+            reverse('posts:post_create'),
+            data={'text': POST_TEXT, 'image': self.image},
+        )
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertIn('image', response.context['form'].errors)
+
+    def test_form_post_create_checks_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        post_count = Post.objects.count()
+        response = client.post(reverse('posts:post_create'),
+                               data={'text': POST_TEXT, 'image': self.image})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Post.objects.count(), post_count)
+
+    def test_form_image_bomb_header(self):
+        def chunk(kind, data):
+            return (struct.pack('>I', len(data)) + kind + data
+                    + struct.pack('>I', zlib.crc32(kind + data)))
+
+        png = (b'\x89PNG\r\n\x1a\n'
+               + chunk(b'IHDR', struct.pack('>IIBBBBB', 20000, 20000,
+                                            8, 2, 0, 0, 0))
+               + chunk(b'IDAT', zlib.compress(b''))
+               + chunk(b'IEND', b''))
+        post_count = Post.objects.count()
+        response = self.authorized_client_author.post(
+            reverse('posts:post_create'),
+            data={'text': POST_TEXT, 'image': SimpleUploadedFile(
+                'bomb.png', png, content_type='image/png')},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Post.objects.count(), post_count)
+        self.assertIn('image', response.context['form'].errors)
+
+    @mock.patch('posts.uploads.IMAGE_MAX_SIDE', 20)
+    def test_form_image_downscaled_without_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30)).save(buffer, 'JPEG', exif=exif)
+        self.authorized_client_author.post(
+            reverse('posts:post_create'),
+            data={'text': POST_TEXT, 'image': SimpleUploadedFile(
+                'photo.jpg', buffer.getvalue(), content_type='image/jpeg')},
+        )
+        with Image.open(Post.objects.latest('pk').image) as image:
+            self.assertEqual(image.size, (20, 15))
+            self.assertNotIn('exif', image.info)
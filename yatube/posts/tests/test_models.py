@@ -1,5 +1,21 @@
-from django.test import TestCase
-from ..models import Group, Post, User
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connections, transaction
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from core import routers
+from .. import graph, reactions, threads
+from ..consts import COMMENT_MAX_DEPTH
+from ..models import (Comment, Follow, Group, Post, PostReaction,
+                      ReactionShard, StoredFile, User, UserStats)
+from ..storage import post_storage
 
 POST_AUTH = 'auth'
 POST_TEXT = 'Тестовый пост'
@@ -58,3 +74,279 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     task._meta.get_field(field).help_text, expected_value)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug='group',
+            description=GROUP_DESCRIPTION,
+        )
+        cls.other_group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug='other_group',
+            description=GROUP_DESCRIPTION,
+        )
+
+    def assertCounters(self, post=None):
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(stats.post_count,
+                         Post.objects.filter(author=self.user).count())
+        self.assertEqual(stats.follower_count,
+                         Follow.objects.filter(author=self.user).count())
+        for group in (self.group, self.other_group):
+            group.refresh_from_db()
+            self.assertEqual(group.post_count, group.posts.count())
+        if post is not None:
+            post.refresh_from_db()
+            self.assertEqual(post.comment_count, post.comments.count())
+
+    def test_counters_follow_changes(self):
+        post = Post.objects.create(author=self.user, text=POST_TEXT,
+                                   group=self.group)
+        Post.objects.create(author=self.user, text=POST_TEXT)
+        self.assertCounters(post)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(post)
+        comment = Comment.objects.create(post=post, author=self.reader,
+                                         text=POST_TEXT)
+        self.assertCounters(post)
+        comment.delete()
+        self.assertCounters(post)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertCounters(post)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1)
+        Follow.objects.filter(user=self.reader).delete()
+        post.delete()
+        self.assertCounters()
+
+    def test_group_change_compares_with_primary(self):
+        post = Post.objects.create(author=self.user, text=POST_TEXT,
+                                   group=self.group)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        replica = dict(connections.databases[routers.PRIMARY],
+                       NAME=os.path.join(directory, 'replica.sqlite3'))
+        with mock.patch.dict(settings.DATABASES, {routers.REPLICA: replica}), \
+                mock.patch.dict(connections.databases,
+                                {routers.REPLICA: replica}):
+            self.addCleanup(connections.__delitem__, routers.REPLICA)
+            self.addCleanup(connections[routers.REPLICA].close)
+            # Реплика отстала: на ней запись ещё в первой группе.
+            with connections[routers.REPLICA].schema_editor() as editor:
+                for model in (User, Group, Post):
+                    editor.create_model(model)
+            for model in (User, Group, Post):
+                model.objects.using(routers.REPLICA).bulk_create(
+                    model.objects.all())
+            post.group = self.other_group
+            post.save()
+            routers.start()
+            try:
+                self.assertEqual(Post.objects.get(pk=post.pk).group_id,
+                                 self.group.pk)
+                post.group = self.group
+                post.save()
+            finally:
+                routers.finish()
+        self.assertCounters(post)
+
+    def test_rebuild_counters(self):
+        post = Post.objects.create(author=self.user, text=POST_TEXT,
+                                   group=self.group)
+        Comment.objects.create(post=post, author=self.reader, text=POST_TEXT)
+        Follow.objects.create(user=self.reader, author=self.user)
+        UserStats.objects.update(post_count=0, follower_count=7)
+        Group.objects.update(post_count=0)
+        Post.objects.update(comment_count=0)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounters(post)
+
+
+class IndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        Post.objects.create(author=cls.user, text=POST_TEXT)
+
+    def test_follow_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.user)
+
+    def test_listing_queries_use_indexes(self):
+        out = StringIO()
+        call_command('audit_indexes', strict=True, stdout=out)
+        self.assertIn('Полных просмотров не найдено', out.getvalue())
+        self.assertIn('comment_post_path_idx', out.getvalue())
+        self.assertIn('popular', out.getvalue())
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class CommentThreadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+
+    def reply(self, parent=None):
+        if parent is not None:
+            parent = threads.parent_for(self.post.pk, parent.pk)
+        return Comment.objects.create(post=self.post, author=self.user,
+                                      text=POST_TEXT, parent=parent)
+
+    def test_thread_is_ordered_by_path(self):
+        first = self.reply()
+        second = self.reply()
+        answer = self.reply(first)
+        self.assertEqual(list(Comment.objects.filter(post=self.post)),
+                         [first, answer, second])
+        self.assertEqual(list(threads.subtree(first)), [answer])
+        self.assertEqual(answer.depth, 1)
+
+    def test_depth_limit_and_reply_counts(self):
+        root = comment = self.reply()
+        for _ in range(COMMENT_MAX_DEPTH + 1):
+            comment = self.reply(comment)
+        self.assertEqual(comment.depth, COMMENT_MAX_DEPTH - 1)
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, COMMENT_MAX_DEPTH + 1)
+        Comment.objects.get(parent=root).delete()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+
+class ReactionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+
+    def counts(self, user=None):
+        post = reactions.annotate(
+            [Post.objects.get(pk=self.post.pk)], user or self.user)[0]
+        return {reaction['kind']: reaction['count']
+                for reaction in post.reactions}, post.my_reaction
+
+    def test_reaction_is_unique_per_user(self):
+        readers = [User.objects.create_user(username=f'reader_{number}')
+                   for number in range(20)]
+        for reader in readers:
+            reactions.react(reader, self.post, 'like')
+        reactions.react(readers[0], self.post, 'sad')
+        reactions.react(readers[1], self.post, 'like')
+        self.assertEqual(PostReaction.objects.count(), 19)
+        counts, mine = self.counts(readers[0])
+        self.assertEqual((counts['like'], counts['sad'], mine),
+                         (18, 1, 'sad'))
+        self.assertEqual(self.counts(readers[1])[1], None)
+        self.assertGreater(ReactionShard.objects.count(), 2)
+
+    def test_annotate_page_in_two_queries(self):
+        posts = [Post.objects.create(author=self.user, text=POST_TEXT)
+                 for _ in range(3)]
+        reactions.react(self.user, posts[1], 'laugh')
+        with self.assertNumQueries(2):
+            reactions.annotate(posts, self.user)
+        self.assertEqual(posts[1].my_reaction, 'laugh')
+        posts[1].delete()
+        self.assertFalse(ReactionShard.objects.filter(
+            target=reactions.target(posts[1])).exists())
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = [User.objects.create_user(username=f'user_{number}')
+                     for number in range(5)]
+        first, second, third, fourth, _ = cls.users
+        for user, author in ((first, second), (second, first),
+                             (first, third), (second, fourth),
+                             (third, fourth)):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_graph_queries(self):
+        first, second, third, fourth, fifth = self.users
+        self.assertTrue(graph.is_following(first.pk, second.pk))
+        with self.assertNumQueries(0):
+            self.assertFalse(graph.is_following(first.pk, fourth.pk))
+        self.assertEqual(list(graph.mutual(first.pk)), [second.pk])
+        self.assertEqual(graph.follower_count(fourth.pk), 2)
+        self.assertEqual(graph.suggestions(first.pk), [fourth.pk])
+        self.assertEqual(graph.suggestions(fifth.pk), [])
+        Follow.objects.filter(user=first, author=second).delete()
+        self.assertFalse(graph.is_following(first.pk, second.pk))
+        self.assertEqual(list(graph.mutual(first.pk)), [])
+
+    def test_annotate_users(self):
+        with self.assertNumQueries(1):
+            graph.annotate(self.users, self.users[0])
+        self.assertEqual([user.is_followed for user in self.users],
+                         [False, True, True, False, False])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class StoredFileTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user, text=POST_TEXT,
+            image=SimpleUploadedFile(name, SMALL_GIF,
+                                     content_type='image/gif'))
+
+    def setUp(self):
+        self.user = User.objects.create_user(username=POST_AUTH)
+
+    def test_same_image_is_stored_once(self):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        stored = StoredFile.objects.get(name=first.image.name)
+        self.assertEqual(stored.references, 2)
+        first.delete()
+        stored.refresh_from_db()
+        self.assertEqual(stored.references, 1)
+        second.delete()
+        self.assertFalse(StoredFile.objects.exists())
+
+    @mock.patch('posts.media.MEDIA_ORPHAN_AGE', -60)
+    def test_cleanup_media_removes_orphans(self):
+        post = self.create_post('kept.gif')
+        orphan = post_storage.save('posts/orphan.gif',
+                                   SimpleUploadedFile('orphan.gif', b'GIF8'))
+        call_command('cleanup_media', stdout=StringIO())
+        self.assertTrue(post_storage.exists(post.image.name))
+        self.assertFalse(post_storage.exists(orphan))
+        self.assertEqual(
+            StoredFile.objects.get(name=post.image.name).references, 1)
@@ -1,14 +1,23 @@
+import base64
+import json
 import shutil
 import tempfile
+import time
+from unittest import mock
 
 from django.test import TestCase, Client, override_settings
-from ..models import Post, Group, User, Comment, Follow
+from ..models import Post, Group, User, Comment, Follow, TimelineEntry
 from django.urls import reverse
 from django import forms
-from ..consts import PAGINATOR_CONST
+from ..consts import (COMMENT_COLLAPSE_DEPTH, COMMENTS_PER_PAGE,
+                      PAGINATOR_CONST, PAGINATOR_OFFSET_PAGES)
+from .. import buffer, search, thumbnails, trending
+from ..conditional import cached_field
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 POST_AUTH = 'auth'
@@ -84,6 +93,7 @@ class TaskViewsTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user_not_author = User.objects.create_user(username='qwerty')
         self.authorized_client = Client()
@@ -128,6 +138,49 @@ class TaskViewsTests(TestCase):
             kwargs={'username': TaskViewsTests.post.author}) + '?page=2')
         self.assertEqual(len(response_2.context['page_obj']), 1)
 
+    def test_index_page_cursor(self):
+        response_1 = self.authorized_client_author.get(self.url_address_map
+                                                       ['index'])
+        page_1 = response_1.context['page_obj']
+        response_2 = self.authorized_client_author.get(
+            reverse('posts:index') + f'?cursor={page_1.next_cursor}')
+        page_2 = response_2.context['page_obj']
+        self.assertEqual(len(page_2), 1)
+        self.assertEqual(page_2.number, 2)
+        self.assertFalse(page_2.has_next())
+        response_3 = self.authorized_client_author.get(
+            reverse('posts:index') + f'?cursor={page_2.previous_cursor}')
+        self.assertEqual(list(response_3.context['page_obj']), list(page_1))
+        self.assertFalse(response_3.context['page_obj'].has_previous())
+
+    def test_tampered_cursor_opens_first_page(self):
+        cursors = (
+            ['n', ['garbage', 1], 2],
+            ['n', [{'a': 1}, 1], 2],
+            ['n', [None, None], 2],
+            ['n', ['2020-01-01T00:00:00+00:00', 'x'], 2],
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                value = base64.urlsafe_b64encode(
+                    json.dumps(cursor).encode()).decode()
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'cursor': value})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_deep_offset_page_is_capped(self):
+        response = self.guest_client.get(
+            reverse('posts:index'),
+            {'page': PAGINATOR_OFFSET_PAGES + 1})
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_index_page_without_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('posts:index') + '?page=2')
+        self.assertFalse(any('COUNT(*)' in query['sql']
+                             for query in queries.captured_queries))
+
     def test_index_context(self):
         response = self.authorized_client_author.get(self.url_address_map
                                                      ['index'])
@@ -159,6 +212,13 @@ class TaskViewsTests(TestCase):
         self.assertEqual(first_author, TaskViewsTests.post.author)
         self.assertEqual(task_image_0, self.post.image)
 
+    def test_profile_without_stats(self):
+        User.objects.bulk_create([User(username='bulk')])
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'bulk'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['post_count'], 0)
+
     def test_post_detail_context(self):
         response = self.authorized_client_author.get(
             self.url_address_map['detail'])
@@ -207,19 +267,28 @@ class TaskViewsTests(TestCase):
     def test_index_cache(self):
         response = self.authorized_client_author.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text='tyuio',
-            author=self.user,
-        )
+        Post.objects.filter(pk=self.post.pk).update(text='без сигналов')
         response_old = self.authorized_client_author.get(
             reverse('posts:index'))
         old_posts = response_old.content
         self.assertEqual(old_posts, posts)
-        cache.clear()
+        Post.objects.create(
+            text='tyuio',
+            author=self.user,
+        )
         response_new = self.authorized_client_author.get(
             reverse('posts:index'))
         new_posts = response_new.content
         self.assertNotEqual(old_posts, new_posts)
+        self.assertContains(response_new, 'tyuio')
+
+    def test_index_cache_comment(self):
+        self.authorized_client_author.get(reverse('posts:index'))
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': COMMENT_TEXT})
+        response = self.authorized_client_author.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 2')
 
     def test_following(self):
         self.authorized_client.get(
@@ -252,3 +321,448 @@ class TaskViewsTests(TestCase):
             reverse('posts:follow_index'))
         self.assertEqual(response_1.context['page_obj'][0], self.post)
         self.assertNotEqual(response_2.context['page_obj'], self.post)
+
+    def test_follow_index_timeline(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': TaskViewsTests.post.author}))
+        new_post = Post.objects.create(text=POST_TEXT, author=self.user)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user_not_author, post=new_post).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], new_post)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': TaskViewsTests.post.author}))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.user_not_author).exists())
+
+    def test_thumbnail_placeholder_until_generated(self):
+        post = Post.objects.create(
+            author=self.user,
+            text=POST_TEXT,
+            image=SimpleUploadedFile(name='small.gif',
+                                     content=self.small_gif,
+                                     content_type='image/gif'),
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        response = self.authorized_client.get(url)
+        self.assertNotContains(response, '<img class="card-img')
+        self.assertContains(response, 'aspect-ratio: 400 / 200')
+        thumbnails.generate(post.image.name)
+        self.assertIsNotNone(thumbnails.ready(post.image, 'card'))
+        response = self.authorized_client.get(url)
+        self.assertContains(response, '<img class="card-img')
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, '_detail_400.webp 400w')
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 1)
+    def test_follow_index_celebrity(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': TaskViewsTests.post.author}))
+        new_post = Post.objects.create(text=POST_TEXT, author=self.user)
+        self.assertFalse(TimelineEntry.objects.filter(
+            post=new_post).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], new_post)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.author = User.objects.create_user(username=POST_AUTH)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(PAGINATOR_CONST + 1):
+            author = User.objects.create_user(username=f'author_{number}')
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                author=author,
+                text=POST_TEXT,
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=author,
+                                   text=COMMENT_TEXT)
+            Post.objects.create(author=cls.author, text=POST_TEXT)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        url_last_page = {
+            reverse('posts:index'): 3,
+            reverse('posts:group_posts', kwargs={'slug': GROUP_SLUG}): 2,
+            reverse('posts:profile', kwargs={'username': POST_AUTH}): 2,
+            reverse('posts:follow_index'): 3,
+        }
+        for url, last_page in url_last_page.items():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as full_page:
+                    self.client.get(url)
+                with CaptureQueriesContext(connection) as short_page:
+                    response = self.client.get(f'{url}?page={last_page}')
+                self.assertLess(len(response.context['page_obj']),
+                                PAGINATOR_CONST)
+                self.assertEqual(len(full_page), len(short_page))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.post = Post.objects.create(
+            author=cls.user, text='Красивые записи о путешествиях')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Записи о погоде')
+        Comment.objects.create(post=cls.other, author=cls.user,
+                               text='Красивая погода')
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:post_search'),
+                                   {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_backends(self):
+        for fts in (True, False):
+            with self.subTest(fts=fts), mock.patch(
+                    'posts.search.index.uses_fts', return_value=fts):
+                search.rebuild()
+                self.assertEqual(self.search('красивой записью'),
+                                 [self.post, self.other])
+                self.assertEqual(self.search('погода'), [self.other])
+                self.assertEqual(self.search('море'), [])
+
+    def test_search_follows_changes(self):
+        self.post.text = 'Про море'
+        self.post.save()
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Синее море')
+        self.assertEqual(self.search('море'), [self.post])
+        self.assertEqual(self.search('путешествия'), [])
+        self.post.delete()
+        self.assertEqual(self.search('море'), [])
+
+    def test_comments_are_indexed_separately(self):
+        for fts in (True, False):
+            with self.subTest(fts=fts), mock.patch(
+                    'posts.search.index.uses_fts', return_value=fts):
+                search.rebuild()
+                with mock.patch('posts.search.index.terms',
+                                wraps=search.index.terms) as tokenize:
+                    comment = Comment.objects.create(
+                        post=self.post, author=self.user, text='Синее море')
+                self.assertEqual(tokenize.call_count, 1)
+                self.assertEqual(self.search('море путешествия'),
+                                 [self.post])
+                comment.delete()
+                self.assertEqual(self.search('море'), [])
+                self.assertEqual(self.search('погода'), [self.other])
+
+    def test_post_delete_skips_comment_handlers(self):
+        post = Post.objects.create(author=self.user, text='Про море')
+        for text in ('Первый', 'Второй', 'Третий'):
+            Comment.objects.create(post=post, author=self.user, text=text)
+        with mock.patch('posts.signals.threads.remove') as remove:
+            post.delete()
+        remove.assert_not_called()
+        self.assertEqual(self.search('море'), [])
+        self.assertEqual(self.search('второй'), [])
+
+
+class ConditionalTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_page_returns_not_modified(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': POST_AUTH}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                Comment.objects.create(post=self.post, author=self.user,
+                                       text=COMMENT_TEXT)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_index_is_validated_by_date(self):
+        url = reverse('posts:index')
+        modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 304)
+        with mock.patch('posts.generations.time.time',
+                        return_value=time.time() + 10):
+            Post.objects.create(author=self.user, text=POST_TEXT)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], modified)
+
+    def test_lookups_follow_renames(self):
+        group = Group.objects.create(title=GROUP_TITLE, slug=GROUP_SLUG,
+                                     description=GROUP_DESCRIPTION)
+        self.assertEqual(cached_field(User, 'username', POST_AUTH),
+                         self.user.pk)
+        self.assertEqual(cached_field(Group, 'slug', GROUP_SLUG), group.pk)
+        self.user.username = 'renamed'
+        self.user.save()
+        group.delete()
+        newcomer = User.objects.create_user(username=POST_AUTH)
+        new_group = Group.objects.create(title=GROUP_TITLE, slug=GROUP_SLUG,
+                                         description=GROUP_DESCRIPTION)
+        self.assertEqual(cached_field(User, 'username', POST_AUTH),
+                         newcomer.pk)
+        self.assertEqual(cached_field(Group, 'slug', GROUP_SLUG),
+                         new_group.pk)
+
+    def test_cache_control(self):
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotEqual(
+            self.client.get(url)['ETag'],
+            Client().get(url)['ETag'])
+
+    def test_anonymous_page_cache(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        first = self.client.get(url)
+        with override_settings(COUNTER_FLUSH_INTERVAL=3600):
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        self.assertNotIn(b'<!--hole:', second.content)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text=COMMENT_TEXT)
+        self.assertContains(self.client.get(url), COMMENT_TEXT)
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(url), 'Выйти')
+
+    def test_anonymous_page_key_ignores_other_params(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        for params in ({'utm_source': 'mail'}, {'page': 'abc'},
+                       {'page': PAGINATOR_OFFSET_PAGES + 1}):
+            with self.subTest(params=params):
+                with self.assertNumQueries(0):
+                    self.client.get(url, params)
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+        for number in range(COMMENTS_PER_PAGE + 1):
+            author = User.objects.create_user(username=f'reader_{number}')
+            Comment.objects.create(post=cls.post, author=author,
+                                   text=f'{COMMENT_TEXT} {number}')
+
+    def test_comments_are_loaded_by_pages(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, f'{COMMENT_TEXT} 0')
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'cursor': comments.next_cursor})
+        self.assertLessEqual(len(queries), 3)
+        self.assertEqual([comment.text for comment in
+                          response.context['comments']],
+                         [f'{COMMENT_TEXT} {COMMENTS_PER_PAGE}'])
+        self.assertNotContains(response, 'data-comments')
+
+    def test_deep_replies_are_collapsed(self):
+        parent = Comment.objects.first()
+        for _ in range(COMMENT_COLLAPSE_DEPTH):
+            parent = Comment.objects.create(post=self.post, author=self.user,
+                                            text='Ответ', parent=parent)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertContains(response, 'Ответ',
+                            count=COMMENT_COLLAPSE_DEPTH - 1)
+        self.assertContains(response, 'Ещё ответов: 1')
+        collapsed = Comment.objects.get(depth=COMMENT_COLLAPSE_DEPTH - 1)
+        response = self.client.get(reverse(
+            'posts:comment_replies',
+            kwargs={'post_id': self.post.pk, 'comment_id': collapsed.pk}))
+        self.assertEqual(list(response.context['comments']), [parent])
+
+    def test_reply_is_attached_to_parent(self):
+        parent = Comment.objects.first()
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Ответ', 'parent': parent.pk})
+        self.assertEqual(Comment.objects.get(text='Ответ').parent, parent)
+
+
+class ReactionViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.post = Post.objects.create(author=cls.user, text=POST_TEXT)
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.user,
+                                             text=COMMENT_TEXT)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_reactions_are_shown_in_feed(self):
+        self.client.get(reverse('posts:index'))
+        self.client.post(
+            reverse('posts:post_react', kwargs={'post_id': self.post.pk}),
+            {'kind': 'like'})
+        self.client.post(
+            reverse('posts:comment_react', kwargs={
+                'post_id': self.post.pk, 'comment_id': self.comment.pk}),
+            {'kind': 'sad'})
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            'Нравится: 1')
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertEqual(response.context['post_one'].my_reaction, 'like')
+        self.assertEqual(response.context['comments'][0].my_reaction, 'sad')
+
+
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.posts = [Post.objects.create(author=cls.user, text=POST_TEXT)
+                     for _ in range(2)]
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=3600)
+    def test_views_are_written_in_batches(self):
+        for post in self.posts * 2:
+            self.client.get(reverse('posts:post_detail',
+                                    kwargs={'post_id': post.pk}))
+        for post in self.posts:
+            post.refresh_from_db()
+            self.assertEqual(post.view_count, 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), len(self.posts))
+        updates = [query for query in queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        for post in self.posts:
+            post.refresh_from_db()
+            self.assertEqual(post.view_count, 2)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=5)
+    @mock.patch.dict(buffer._state, timer_pid=None)
+    @mock.patch('posts.buffer.threading.Thread')
+    def test_timer_is_started_once(self, thread):
+        for post in self.posts:
+            buffer.add(Post, post.pk, 'view_count')
+        thread.assert_called_once()
+        self.assertEqual(thread.call_args.kwargs['args'], (5,))
+        self.assertEqual(buffer.flush(), len(self.posts))
+
+
+class PopularTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=POST_AUTH)
+        cls.quiet = Post.objects.create(author=cls.user, text=POST_TEXT)
+        cls.discussed = Post.objects.create(author=cls.user, text=POST_TEXT)
+        cls.fresh = Post.objects.create(author=cls.user, text=POST_TEXT)
+        for _ in range(20):
+            Comment.objects.create(post=cls.discussed, author=cls.user,
+                                   text=COMMENT_TEXT)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_popular_feed_is_ranked_by_score(self):
+        self.assertEqual(trending.update(), 3)
+        self.assertEqual(trending.update(), 0)
+        response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.discussed, self.fresh, self.quiet])
+        Comment.objects.create(post=self.quiet, author=self.user,
+                               text=COMMENT_TEXT)
+        self.assertEqual(trending.update(), 1)
+
+    def test_popular_page_does_not_aggregate(self):
+        trending.update()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:popular'))
+        self.assertFalse([query for query in queries
+                          if 'posts_comment' in query['sql']])
+
+
+class FollowStateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.followed = User.objects.create_user(username='followed')
+        cls.other = User.objects.create_user(username='other')
+        Follow.objects.create(user=cls.reader, author=cls.followed)
+        for author in (cls.followed, cls.other):
+            Post.objects.create(author=author, text=POST_TEXT)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_feed_is_annotated_with_follow_state(self):
+        with self.assertNumQueries(1):
+            posts = list(Post.objects.with_follow_state(self.reader))
+        self.assertEqual({post.author_id: post.author_followed
+                          for post in posts},
+                         {self.followed.pk: True, self.other.pk: False})
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отписаться от followed')
+        self.assertContains(response, 'Подписаться на other')
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': 'other'}))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отписаться от other')
+
+    def test_follow_changes_feed_etag(self):
+        pages = (
+            (reverse('posts:index'), 'posts:profile_follow'),
+            (reverse('posts:popular'), 'posts:profile_unfollow'),
+        )
+        for url, action in pages:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.client.get(reverse(action,
+                                        kwargs={'username': 'other'}))
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
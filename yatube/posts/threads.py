@@ -0,0 +1,78 @@
+"""Ветки комментариев с материализованным путём.
+
+Путь комментария — идентификаторы его предков и его собственный,
+каждый дополнен нулями до COMMENT_PATH_STEP знаков. Поэтому вся ветка
+или поддерево выбираются одним запросом по индексу (post, path)
+с условием path LIKE 'префикс%', а сортировка по пути сразу даёт
+порядок вывода. В reply_count хранится число комментариев в поддереве,
+оно выводится у свёрнутых веток.
+"""
+from django.db.models import F
+
+from .consts import (COMMENT_COLLAPSE_DEPTH, COMMENT_MAX_DEPTH,
+                     COMMENT_PATH_STEP)
+from .models import Comment
+
+
+def segment(pk):
+    return f'{pk:0{COMMENT_PATH_STEP}d}'
+
+
+def ancestors(path):
+    """Идентификаторы предков комментария по его пути."""
+    return [int(path[start:start + COMMENT_PATH_STEP])
+            for start in range(0, len(path) - COMMENT_PATH_STEP,
+                               COMMENT_PATH_STEP)]
+
+
+def parent_for(post_id, parent_id):
+    """Комментарий, к которому прикрепляется ответ, с учётом глубины."""
+    try:
+        parent = Comment.objects.only('path', 'depth').get(
+            post=post_id, pk=parent_id)
+    except (Comment.DoesNotExist, TypeError, ValueError):
+        return None
+    if parent.depth < COMMENT_MAX_DEPTH - 1:
+        return parent
+    return Comment(pk=ancestors(parent.path)[COMMENT_MAX_DEPTH - 2])
+
+
+def place(comment):
+    """Записывает путь нового комментария и считает его в ветках
+    предков."""
+    path, depth = '', 0
+    if comment.parent_id is not None:
+        path, depth = Comment.objects.filter(
+            pk=comment.parent_id).values_list('path', 'depth').get()
+        depth += 1
+    comment.path = path + segment(comment.pk)
+    comment.depth = depth
+    Comment.objects.filter(pk=comment.pk).update(
+        path=comment.path, depth=depth)
+    _add_replies(comment.path, 1)
+
+
+def remove(comment):
+    _add_replies(comment.path, -1)
+
+
+def _add_replies(path, delta):
+    pks = ancestors(path)
+    if pks:
+        queryset = Comment.objects.filter(pk__in=pks)
+        if delta < 0:
+            queryset = queryset.filter(reply_count__gte=-delta)
+        queryset.update(reply_count=F('reply_count') + delta)
+
+
+def visible(post_id):
+    """Комментарии записи без свёрнутых глубоких ответов."""
+    return Comment.objects.filter(post=post_id,
+                                  depth__lt=COMMENT_COLLAPSE_DEPTH)
+
+
+def subtree(comment):
+    """Все ответы в ветке комментария."""
+    return Comment.objects.filter(post=comment.post_id,
+                                  path__startswith=comment.path,
+                                  depth__gt=comment.depth)
@@ -0,0 +1,105 @@
+"""Заблаговременная генерация миниатюр изображений записей.
+
+Все размеры, в которых шаблоны выводят изображение записи, перечислены
+в IMAGE_GEOMETRIES. После сохранения записи с новым изображением
+миниатюры и варианты всех размеров создаются в фоновом пуле потоков,
+а шаблоны до их готовности показывают заглушку и сами Pillow
+не вызывают.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import generations, variants
+from .consts import IMAGE_GEOMETRIES
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class LookupBackend(ThumbnailBackend):
+    """Находит готовую миниатюру, не создавая её."""
+
+    def lookup(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        # Параметры дополняются так же, как в ThumbnailBackend.get_thumbnail,
+        # чтобы имя миниатюры совпало с созданной.
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+_lookup = LookupBackend()
+
+
+def ready(image, size):
+    """Готовая миниатюра изображения или None, если её ещё нет."""
+    if not image:
+        return None
+    geometry, options = IMAGE_GEOMETRIES[size]
+    return _lookup.lookup(image.name, geometry, **options)
+
+
+def generate(name):
+    """Создаёт миниатюры и варианты всех размеров, обновляет карточки."""
+    try:
+        for geometry, options in IMAGE_GEOMETRIES.values():
+            get_thumbnail(name, geometry, **options)
+        built = variants.build(name)
+        # Карточки с заглушкой закэшированы, поэтому записи с этим
+        # изображением считаются изменёнными.
+        posts = list(Post.objects.filter(image=name).only(
+            'author_id', 'group_id'))
+        Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+            image_variants=built, updated=timezone.now())
+        for post in posts:
+            generations.bump(*generations.post_feeds(post))
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+
+
+def _run(name):
+    try:
+        generate(name)
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def schedule(image):
+    """Ставит создание миниатюр в очередь после фиксации транзакции."""
+    if not image:
+        return
+    name = image.name
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: _get_executor().submit(_run, name))
+    else:
+        transaction.on_commit(lambda: generate(name))
@@ -0,0 +1,95 @@
+"""Материализованная лента подписок.
+
+Записи автора раскладываются по лентам подписчиков при публикации
+(fan-out on write). Для авторов с очень большим числом подписчиков
+раскладка не выполняется: их записи подмешиваются в ленту при чтении.
+"""
+from django.db.models import Q, Subquery
+
+from .consts import (TIMELINE_BACKFILL_LIMIT, TIMELINE_BATCH_SIZE,
+                     TIMELINE_FANOUT_LIMIT)
+from .models import FEED_FIELDS, Follow, Post, TimelineEntry, UserStats
+
+
+def follower_count(author_id):
+    return UserStats.objects.filter(user_id=author_id).values_list(
+        'follower_count', flat=True).first() or 0
+
+
+def is_celebrity(author_id):
+    return follower_count(author_id) >= TIMELINE_FANOUT_LIMIT
+
+
+def celebrities_followed_by(user):
+    """Авторы из подписок пользователя, записи которых читаются напрямую."""
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__follower_count__gte=TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+
+
+def _store(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=TIMELINE_BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раскладывает новую запись по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _store(TimelineEntry(user_id=user_id, post_id=post.pk,
+                         author_id=post.author_id, pub_date=post.pub_date)
+           for user_id in follower_ids.iterator())
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту пользователя последние записи автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')[:TIMELINE_BACKFILL_LIMIT]
+    _store(TimelineEntry(user_id=user_id, post_id=post_id,
+                         author_id=author_id, pub_date=pub_date)
+           for post_id, pub_date in posts)
+
+
+def backfill_followers(author_id):
+    """Заполняет ленты всех подписчиков автора, переставшего быть
+    исключением из раскладки."""
+    follower_ids = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    for user_id in follower_ids.iterator():
+        backfill(user_id, author_id)
+
+
+def drop(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 author_id=author_id).delete()
+
+
+def feed(user):
+    """Возвращает запрос для ленты подписок пользователя.
+
+    Без подписок на исключённых из раскладки авторов лента читается
+    одним диапазоном индекса по записям ленты. Иначе к ней подмешиваются
+    записи таких авторов.
+    """
+    celebrities = celebrities_followed_by(user)
+    if not celebrities:
+        return TimelineEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        ).only(
+            'pub_date', 'post', *(f'post__{field}' for field in FEED_FIELDS)
+        )
+    own = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.feed().filter(
+        Q(pk__in=Subquery(own)) | Q(author_id__in=celebrities))
+
+
+def as_posts(page):
+    """Заменяет записи ленты на соответствующие им посты."""
+    page.object_list = [
+        entry.post if isinstance(entry, TimelineEntry) else entry
+        for entry in page.object_list
+    ]
+    return page
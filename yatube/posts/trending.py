@@ -0,0 +1,95 @@
+"""Лента популярных записей.
+
+Рейтинг записи — десятичный логарифм её активности (комментарии,
+реакции, просмотры, подписчики автора) плюс время публикации, делённое
+на TRENDING_DECAY. Старение учтено самим временем публикации, поэтому
+рейтинг меняется только вместе с активностью: задание update_trending
+перезаписывает лишь записи, у которых она изменилась, и удаляет записи
+старше TRENDING_WINDOW. Лента читается из готовой таблицы PostScore
+по индексу, без агрегатов в запросе страницы.
+"""
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import counters, generations
+from .consts import (TRENDING_BATCH_SIZE, TRENDING_DECAY, TRENDING_WEIGHTS,
+                     TRENDING_WINDOW)
+from .models import FEED_FIELDS, Post, PostScore, ReactionShard, followed_by
+
+SCORE_KEYS = ('-score', '-post_id')
+
+
+def score(pub_date, activity):
+    return (math.log10(max(activity, 1))
+            + pub_date.timestamp() / TRENDING_DECAY)
+
+
+def _reactions(posts):
+    rows = (ReactionShard.objects
+            .filter(target__in=[f'post:{post.pk}' for post in posts])
+            .values('target').annotate(total=Sum('count')).order_by())
+    return {int(row['target'].split(':')[1]): row['total'] for row in rows}
+
+
+def _activity(post, reactions):
+    return (TRENDING_WEIGHTS['comments'] * post.comment_count
+            + TRENDING_WEIGHTS['reactions'] * reactions.get(post.pk, 0)
+            + TRENDING_WEIGHTS['views'] * post.view_count
+            + TRENDING_WEIGHTS['followers']
+            * counters.user_stats(post.author).follower_count)
+
+
+def update():
+    """Пересчитывает рейтинги изменившихся записей.
+
+    Возвращает число перезаписанных и удалённых строк рейтинга.
+    """
+    since = timezone.now() - timedelta(seconds=TRENDING_WINDOW)
+    removed = PostScore.objects.filter(post__pub_date__lt=since).delete()[0]
+    posts = (Post.objects.filter(pub_date__gte=since)
+             .select_related('author__stats', 'score')
+             .only('pub_date', 'comment_count', 'view_count',
+                   'author__stats__follower_count', 'score__activity')
+             .order_by('pk'))
+    changed = []
+    last = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last)[:TRENDING_BATCH_SIZE])
+        if not batch:
+            break
+        last = batch[-1].pk
+        reactions = _reactions(batch)
+        for post in batch:
+            activity = _activity(post, reactions)
+            stored = getattr(post, 'score', None)
+            if stored is None or stored.activity != activity:
+                changed.append(PostScore(
+                    post=post, activity=activity,
+                    score=score(post.pub_date, activity)))
+    with transaction.atomic():
+        PostScore.objects.filter(
+            pk__in=[row.post_id for row in changed]).delete()
+        PostScore.objects.bulk_create(changed, TRENDING_BATCH_SIZE)
+    if changed or removed:
+        generations.bump(generations.TRENDING)
+    return len(changed) + removed
+
+
+def feed(viewer):
+    """Строки рейтинга для постраничного вывода по SCORE_KEYS."""
+    return PostScore.objects.select_related(
+        'post__author', 'post__group').only(
+        'score', *(f'post__{field}' for field in FEED_FIELDS)).annotate(
+        author_followed=followed_by(viewer, 'post__author'))
+
+
+def as_posts(page):
+    """Заменяет строки рейтинга на записи."""
+    for row in page.object_list:
+        row.post.author_followed = row.author_followed
+    page.object_list = [row.post for row in page.object_list]
+    return page
@@ -0,0 +1,123 @@
+"""Приём и обработка изображений записей.
+
+ImageUploadHandler пишет загружаемый файл сразу во временный файл
+на диске, поэтому в памяти запроса держится не больше одного блока.
+По первым байтам он определяет формат и размеры изображения
+и пропускает файл, не дочитывая его, если тот слишком велик или
+не является изображением; причина сохраняется в request.upload_errors
+и выводится формой как ошибка поля. Обработчик подключается только
+к представлениям, принимающим изображения, декоратором accepts_images.
+
+process() уменьшает слишком большие изображения и удаляет EXIF
+(в нём бывают координаты съёмки) перед сохранением.
+"""
+import warnings
+from functools import wraps
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .consts import (IMAGE_FORMATS, IMAGE_HEADER_LIMIT, IMAGE_MAX_PIXELS,
+                     IMAGE_MAX_SIDE, IMAGE_MAX_SIZE, IMAGE_QUALITY)
+
+# Сведения, которые сохраняются при перекодировании изображения.
+KEPT_INFO = ('icc_profile', 'transparency', 'duration', 'loop')
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+        self.header = bytearray()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > IMAGE_MAX_SIZE:
+            self.reject(f'Файл больше '
+                        f'{filesizeformat(IMAGE_MAX_SIZE)}.')
+        if self.header is not None:
+            self.header += raw_data[:IMAGE_HEADER_LIMIT - len(self.header)]
+            self.check_header()
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', Image.DecompressionBombWarning)
+                image = Image.open(BytesIO(self.header))
+        except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+            self.reject('Изображение содержит слишком много точек.')
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            # Заголовок JPEG может не уместиться в первый блок.
+            if len(self.header) >= IMAGE_HEADER_LIMIT:
+                self.reject('Загрузите изображение.')
+            return
+        self.header = None
+        if image.format not in IMAGE_FORMATS:
+            self.reject('Этот формат изображений не поддерживается.')
+        width, height = image.size
+        if width * height > IMAGE_MAX_PIXELS:
+            self.reject('Изображение содержит слишком много точек.')
+
+    def reject(self, message):
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = {}
+        self.request.upload_errors[self.field_name] = message
+        raise SkipFile(message)
+
+
+def accepts_images(view):
+    """Принимает файлы запроса через ImageUploadHandler.
+
+    Обработчик ставится до чтения тела запроса, поэтому проверка CSRF,
+    которая читает request.POST, переносится внутрь представления.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+def errors(request):
+    """Ошибки загрузки файлов запроса по именам полей."""
+    return getattr(request, 'upload_errors', {})
+
+
+def process(upload):
+    """Возвращает изображение без EXIF и не больше IMAGE_MAX_SIDE."""
+    if not isinstance(upload, UploadedFile):
+        return upload
+    upload.seek(0)
+    image = Image.open(upload)
+    image_format = image.format
+    too_big = max(image.size) > IMAGE_MAX_SIDE
+    if not too_big and 'exif' not in image.info:
+        upload.seek(0)
+        return upload
+    if too_big and getattr(image, 'is_animated', False):
+        raise ValidationError('Анимированное изображение слишком большое.')
+    # JPEG сразу декодируется в уменьшенном масштабе, что экономит
+    # память на больших фотографиях.
+    image.draft(image.mode, (IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+    info = {key: image.info[key] for key in KEPT_INFO if key in image.info}
+    image = ImageOps.exif_transpose(image)
+    image.info.pop('exif', None)
+    image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+    # Изображение уже декодировано, поэтому результат записывается
+    # на место исходного файла и закрывается вместе с запросом.
+    upload.seek(0)
+    upload.truncate()
+    image.save(upload, image_format, quality=IMAGE_QUALITY, **info)
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
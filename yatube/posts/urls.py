@@ -6,9 +6,18 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('popular/', views.popular, name='popular'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('posts/search/', views.post_search, name='post_search'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/',
+         views.comment_replies, name='comment_replies'),
+    path('posts/<int:post_id>/react/', views.post_react, name='post_react'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/react/',
+         views.comment_react, name='comment_react'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment,
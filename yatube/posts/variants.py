@@ -0,0 +1,115 @@
+"""Уменьшенные копии изображения записи в современных форматах.
+
+Для каждого размера из IMAGE_GEOMETRIES создаются копии нескольких
+ширин в WebP (и AVIF, если Pillow умеет его записывать). Имена копий
+выводятся из имени исходного файла, поэтому готовые копии повторно
+не кодируются, а удаляются вместе с исходным файлом. Описание копий
+хранится в Post.image_variants как JSON:
+{размер: {MIME-тип: [[ширина, имя файла], ...]}}, поэтому шаблонам
+для srcset не нужны дополнительные запросы.
+"""
+import json
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .consts import (IMAGE_GEOMETRIES, IMAGE_VARIANT_QUALITY,
+                     IMAGE_VARIANT_WIDTHS)
+from .storage import post_storage
+
+VARIANTS_DIR = 'posts/variants'
+# Формат Pillow, MIME-тип, расширение; браузер выбирает первый
+# поддерживаемый источник, поэтому более плотный формат идёт первым.
+FORMATS = (
+    ('AVIF', 'image/avif', 'avif'),
+    ('WEBP', 'image/webp', 'webp'),
+)
+
+
+def supported_formats():
+    Image.init()
+    return [fmt for fmt in FORMATS if fmt[0] in Image.SAVE]
+
+
+def _widths(width):
+    return sorted({value for value in IMAGE_VARIANT_WIDTHS if value < width}
+                  | {width})
+
+
+def _name(name, size, width, extension):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{VARIANTS_DIR}/{stem}_{size}_{width}.{extension}'
+
+
+def build(name):
+    """Создаёт недостающие копии изображения и возвращает их описание
+    в JSON."""
+    formats = supported_formats()
+    result = {}
+    missing = []
+    for size, (geometry, options) in IMAGE_GEOMETRIES.items():
+        width, height = map(int, geometry.split('x'))
+        sources = result.setdefault(size, {})
+        for variant_width in _widths(width):
+            for pillow_format, mime, extension in formats:
+                variant_name = _name(name, size, variant_width, extension)
+                sources.setdefault(mime, []).append(
+                    [variant_width, variant_name])
+                if not default_storage.exists(variant_name):
+                    missing.append((variant_name, pillow_format,
+                                    variant_width,
+                                    round(height * variant_width / width)))
+    if missing:
+        _encode(name, missing)
+    return json.dumps(result)
+
+
+def _encode(name, missing):
+    with post_storage.open(name) as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands()
+                              or 'transparency' in image.info else 'RGB')
+    resized = {}
+    for variant_name, pillow_format, width, height in missing:
+        if (width, height) not in resized:
+            resized[width, height] = ImageOps.fit(image, (width, height),
+                                                  Image.LANCZOS)
+        buffer = BytesIO()
+        resized[width, height].save(buffer, pillow_format,
+                                    quality=IMAGE_VARIANT_QUALITY)
+        # Копию мог успеть создать другой процесс.
+        saved = default_storage.save(variant_name,
+                                     ContentFile(buffer.getvalue()))
+        if saved != variant_name:
+            default_storage.delete(saved)
+
+
+def _load(value):
+    try:
+        return json.loads(value) if value else {}
+    except ValueError:
+        return {}
+
+
+def remove(name):
+    """Удаляет все копии изображения."""
+    for size, (geometry, options) in IMAGE_GEOMETRIES.items():
+        for width in _widths(int(geometry.split('x')[0])):
+            for _, _, extension in FORMATS:
+                default_storage.delete(_name(name, size, width, extension))
+
+
+def sources(post, size):
+    """Источники для <picture>: MIME-тип и srcset."""
+    return [
+        {'type': mime,
+         'srcset': ', '.join(f'{default_storage.url(saved)} {width}w'
+                             for width, saved in files)}
+        for mime, files in _load(post.image_variants).get(size, {}).items()
+    ]
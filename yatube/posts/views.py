@@ -1,70 +1,136 @@
+from functools import wraps
+
 from django.shortcuts import render, get_object_or_404
-from .models import Post, Group, User, Follow
-from django.core.paginator import Paginator
-from .consts import PAGINATOR_CONST
+from .models import Comment, Post, Group, User, Follow
 from .forms import PostForm, CommentForm
 from django.shortcuts import redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.core.paginator import Paginator
+from . import (buffer, counters, generations, graph, reactions, search,
+               threads, timeline, trending, uploads)
+from .consts import COMMENTS_PER_PAGE, PAGINATOR_CONST
+from .conditional import (cache_policy, feed_condition, follow_feeds,
+                          group_feeds, index_feeds, popular_feeds, post_feeds,
+                          profile_feeds)
+from .pagecache import anonymous_page, reply_to
+from .paginators import COMMENT_KEYS, paginate
 
 
+def _viewer_key(request, page):
+    # Часть ключа кэша страницы ленты, которая зависит от посетителя:
+    # его реакции и подписки на авторов на этой странице.
+    followed = sorted({post.author_id for post in page
+                       if getattr(post, 'author_followed', False)})
+    return (f'{request.user.pk}|{reactions.viewer_key(page)}|'
+            f'{",".join(map(str, followed))}')
+
+
+@cache_policy()
+@feed_condition(index_feeds, per_session=True)
+@anonymous_page(index_feeds)
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, PAGINATOR_CONST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.feed().with_follow_state(request.user)
+    page_obj = paginate(request, posts)
+    reactions.annotate(page_obj, request.user)
     title = 'Последние обновления на сайте'
     context = {
         'page_obj': page_obj,
+        'viewer_key': _viewer_key(request, page_obj),
         'title': title,
         'posts': posts,
+        'feed_version': generations.version(generations.INDEX,
+                                            generations.GROUPS),
+    }
+    return render(request, 'posts/index.html', context)
+
+
+@cache_policy()
+@feed_condition(popular_feeds, per_session=True)
+@anonymous_page(popular_feeds)
+def popular(request):
+    page_obj = trending.as_posts(
+        paginate(request, trending.feed(request.user), trending.SCORE_KEYS))
+    reactions.annotate(page_obj, request.user)
+    context = {
+        'page_obj': page_obj,
+        'title': 'Популярные записи',
+        'popular': True,
+        'viewer_key': _viewer_key(request, page_obj),
+        'feed_version': generations.version(*popular_feeds(request)),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cache_policy()
+@feed_condition(group_feeds, per_session=True)
+@anonymous_page(group_feeds)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, PAGINATOR_CONST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.feed().with_follow_state(request.user).filter(
+        group=group)
+    page_obj = paginate(request, posts)
+    reactions.annotate(page_obj, request.user)
     title = f'Это страница сообщества {group}.'
     context = {
         'title': title,
         'group': group,
         'posts': posts,
         'page_obj': page_obj,
+        'viewer_key': _viewer_key(request, page_obj),
+        'feed_version': generations.version(generations.group(group.pk)),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@cache_policy()
+@feed_condition(profile_feeds, per_session=True)
+@anonymous_page(profile_feeds)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts_list = Post.objects.filter(author__username=username)
-    post_count = posts_list.filter(author__username=username).count()
-    paginator = Paginator(posts_list, PAGINATOR_CONST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    follow_one = Follow.objects.filter(
-        user=request.user.id, author=author.id).exists()
-    if follow_one is True:
-        following = True
-    else:
-        following = False
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    posts_list = Post.objects.feed().filter(author=author)
+    stats = counters.user_stats(author)
+    page_obj = paginate(request, posts_list)
+    reactions.annotate(page_obj, request.user)
+    following = graph.is_following(request.user.id, author.pk)
     context = {
         'page_obj': page_obj,
+        'viewer_key': _viewer_key(request, page_obj),
         'author': author,
-        'post_count': post_count,
+        'stats': stats,
+        'post_count': stats.post_count,
         'username': username,
         'following': following,
+        'feed_version': generations.version(generations.author(author.pk),
+                                            generations.GROUPS),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def _counts_views(view):
+    """Считает просмотры страницы записи, в том числе из кэша."""
+    @wraps(view)
+    def wrapper(request, post_id):
+        response = view(request, post_id)
+        if request.method == 'GET' and response.status_code == 200:
+            buffer.add(Post, post_id, 'view_count')
+        return response
+    return wrapper
+
+
+@cache_policy()
+@feed_condition(post_feeds, per_session=True)
+@_counts_views
+@anonymous_page(post_feeds)
 def post_detail(request, post_id):
-    post_one = get_object_or_404(Post, pk=post_id)
-    post_count = Post.objects.filter(author=post_one.author).count()
+    post_one = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
+    post_count = counters.user_stats(post_one.author).post_count
     form = CommentForm(files=request.FILES or None)
-    comments = post_one.comments.all()
+    comments = _comments_page(request, post_id)
+    reactions.annotate([post_one], request.user)
     if request.method == 'POST':
         if form.is_valid():
             form.save()
@@ -72,16 +138,90 @@ def post_detail(request, post_id):
     context = {
         'post_one': post_one,
         'post_count': post_count,
+        'view_count': post_one.view_count + buffer.pending(
+            Post, post_id, 'view_count') + 1,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'reply_to': reply_to(request),
+        'comments_url': reverse('posts:post_comments', args=(post_id,)),
+        'page_url': reverse('posts:post_detail', args=(post_id,)),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def _comments(request, comments):
+    comments = comments.select_related('author').only(
+        'text', 'created', 'post_id', 'path', 'depth', 'reply_count',
+        'author__username')
+    page = paginate(request, comments, COMMENT_KEYS, COMMENTS_PER_PAGE)
+    reactions.annotate(page, request.user)
+    return page
+
+
+def _comments_page(request, post_id):
+    return _comments(request, threads.visible(post_id))
+
+
+@cache_policy()
+@feed_condition(post_feeds, per_session=True)
+def post_comments(request, post_id):
+    """Следующая страница комментариев для подгрузки на странице записи."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    url = reverse('posts:post_comments', args=(post_id,))
+    context = {
+        'post_id': post_id,
+        'comments': _comments_page(request, post_id),
+        'comments_url': url,
+        'page_url': reverse('posts:post_detail', args=(post_id,)),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@cache_policy()
+@feed_condition(post_feeds, per_session=True)
+def comment_replies(request, post_id, comment_id):
+    """Свёрнутые ответы в ветке комментария."""
+    comment = get_object_or_404(
+        Comment.objects.only('post_id', 'path', 'depth'),
+        post=post_id, pk=comment_id)
+    url = reverse('posts:comment_replies', args=(post_id, comment_id))
+    context = {
+        'post_id': post_id,
+        'comments': _comments(request, threads.subtree(comment)),
+        'comments_url': url,
+        'page_url': url,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@login_required
+@require_POST
+def post_react(request, post_id):
+    post = get_object_or_404(Post.objects.only('author_id', 'group_id'),
+                             pk=post_id)
+    kind = request.POST.get('kind')
+    if kind in reactions.KINDS:
+        reactions.react(request.user, post, kind)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@require_POST
+def comment_react(request, post_id, comment_id):
+    comment = get_object_or_404(Comment.objects.only('post_id'),
+                                post=post_id, pk=comment_id)
+    kind = request.POST.get('kind')
+    if kind in reactions.KINDS:
+        reactions.react(request.user, comment, kind)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@uploads.accepts_images
 @login_required
 def post_create(request):
     if request.method == 'POST':
-        form = PostForm(request.POST or None, files=request.FILES or None)
+        form = PostForm(request.POST or None, files=request.FILES or None,
+                        upload_errors=uploads.errors(request))
         if not form.is_valid():
             return render(request, 'posts/create_post.html', {'form': form})
         post = form.save(commit=False)
@@ -96,13 +236,15 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@uploads.accepts_images
 @login_required
 def post_edit(request, post_id):
     required_post = get_object_or_404(Post, pk=post_id)
     if request.user.id != required_post.author.id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(request.POST, instance=required_post,
-                    files=request.FILES or None)
+                    files=request.FILES or None,
+                    upload_errors=uploads.errors(request))
     if form.is_valid():
         form.save()
         return redirect('posts:post_detail', post_id=required_post.id)
@@ -122,20 +264,45 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        comment.parent = threads.parent_for(post_id,
+                                            request.POST.get('parent'))
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    found = search.find(query) if query else []
+    page_obj = Paginator(found, PAGINATOR_CONST).get_page(
+        request.GET.get('page'))
+    posts = Post.objects.feed().with_follow_state(request.user).in_bulk(
+        page_obj.object_list)
+    page_obj.object_list = [posts[pk] for pk in page_obj.object_list
+                            if pk in posts]
+    reactions.annotate(page_obj.object_list, request.user)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'title': f'Результаты поиска: {query}' if query else 'Поиск',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@cache_policy()
+@feed_condition(follow_feeds, per_session=True)
 def follow_index(request):
-    post = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post, PAGINATOR_CONST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    feed = timeline.feed(request.user)
+    page_obj = timeline.as_posts(paginate(request, feed))
+    reactions.annotate(page_obj, request.user)
     title = 'Лента подписок'
+    suggested = graph.suggestions(request.user.pk)
+    users = User.objects.only('username').in_bulk(suggested)
     context = {
         'page_obj': page_obj,
-        'title': title
+        'viewer_key': _viewer_key(request, page_obj),
+        'title': title,
+        'suggestions': [users[pk] for pk in suggested if pk in users],
     }
     return render(request, 'posts/follow.html', context)
 
@@ -143,11 +310,8 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    test = Follow.objects.filter(user=request.user.id,
-                                 author=author).exists()
-    if request.user != author and test is False:
-        Follow.objects.create(user=request.user, author=author)
-        return redirect('posts:profile', username)
+    if request.user != author:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username)
 
 
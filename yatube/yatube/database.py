@@ -0,0 +1,74 @@
+"""Настройки базы данных из окружения.
+
+DB_ENGINE=sqlite (по умолчанию) или postgresql. Соединения живут
+DB_CONN_MAX_AGE секунд и переиспользуются между запросами. Для SQLite
+при каждом подключении выполняются PRAGMA из SQLITE_PRAGMAS
+(core/db.py): журнал WAL позволяет читать во время записи,
+busy_timeout заставляет писателя ждать блокировку, а не падать
+с «database is locked». SQLITE_TUNING=0 отключает эти настройки.
+
+DB_REPLICA_NAME (и для PostgreSQL DB_REPLICA_HOST) добавляет реплику
+для чтения (core/routers.py). Локально её заменяет копия файла SQLite:
+    cp db.sqlite3 replica.sqlite3
+    DB_REPLICA_NAME=replica.sqlite3 python manage.py runserver
+"""
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'yatube'),
+            'USER': os.environ.get('DB_USER', 'yatube'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'OPTIONS': {'connect_timeout': 5},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME',
+                                   os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'OPTIONS': {
+                'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+                / 1000,
+            },
+        }
+    }
+
+REPLICA_NAME = os.environ.get('DB_REPLICA_NAME')
+REPLICA_HOST = os.environ.get('DB_REPLICA_HOST')
+if REPLICA_NAME or REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': REPLICA_NAME or DATABASES['default']['NAME'],
+        'HOST': REPLICA_HOST or DATABASES['default'].get('HOST', ''),
+        # Тестовая реплика смотрит в тестовую основную базу; набор тестов
+        # запускается без реплики.
+        'TEST': {'MIRROR': 'default'},
+    }
+# Сколько секунд после записи чтения пользователя идут в основную базу,
+# пока реплика догоняет её.
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+
+SQLITE_PRAGMAS = {}
+if os.environ.get('SQLITE_TUNING', '1') != '0':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        # В режиме WAL NORMAL не теряет целостность, только последние
+        # транзакции при отключении питания.
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 2 ** 20)),
+        'temp_store': 'MEMORY',
+    }
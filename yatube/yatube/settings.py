@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from .database import (DATABASES, REPLICA_PIN_SECONDS,  # noqa: F401
+                       SQLITE_PRAGMAS)
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -40,6 +43,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -52,6 +56,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -86,12 +91,8 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
-}
+# Настройки базы задаются окружением, см. yatube/database.py.
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
 
 
 # Password validation
@@ -141,11 +142,67 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Потоки для фоновой генерации миниатюр; 0 — генерировать сразу
+# после фиксации транзакции в том же процессе (так работают тесты,
+# yatube/test_settings.py).
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+# Раз в столько секунд накопленные счётчики просмотров записываются
+# в базу (posts/buffer.py), в том числе фоновым потоком между
+# запросами; 0 — после каждого запроса, без потока.
+COUNTER_FLUSH_INTERVAL = float(os.environ.get('COUNTER_FLUSH_INTERVAL', 5))
+# Общий кэш задаётся окружением: locmem годится только для одного
+# процесса, file и sqlite разделяются всеми процессами на машине.
+# CACHE_LOCAL_ENTRIES > 0 включает LRU в памяти процесса перед общим кэшем.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.sqlite.SQLiteCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_LOCATIONS = {
+    'locmem': '',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'sqlite': os.path.join(BASE_DIR, 'cache.sqlite3'),
+}
+CACHE_LOCAL_ENTRIES = int(os.environ.get('CACHE_LOCAL_ENTRIES', 0))
+SHARED_CACHE = {
+    'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+    'LOCATION': os.environ.get('CACHE_LOCATION',
+                               CACHE_LOCATIONS[CACHE_BACKEND]),
+    'OPTIONS': {
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+    },
+}
+if CACHE_LOCAL_ENTRIES:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.tiered.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'MAX_ENTRIES': CACHE_LOCAL_ENTRIES,
+                'CHECK_INTERVAL': float(
+                    os.environ.get('CACHE_CHECK_INTERVAL', 1)),
+            },
+        },
+        'shared': SHARED_CACHE,
     }
+else:
+    CACHES = {'default': SHARED_CACHE}
+# Сессии по умолчанию читаются из общего кэша и пишутся в базу только
+# при изменении; signed_cookies хранит сессию в подписанной cookie
+# и не обращается к хранилищу вовсе. Запросы без cookie сессии
+# хранилище не читают: сессия загружается при первом обращении.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+SESSION_ENGINE = SESSION_ENGINES[
+    os.environ.get('SESSION_BACKEND', 'cached_db')]
+# Локальный уровень TieredCache видит чужие изменения с задержкой,
+# а выход из аккаунта должен действовать сразу.
+SESSION_CACHE_ALIAS = 'shared' if CACHE_LOCAL_ENTRIES else 'default'
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
@@ -0,0 +1,8 @@
+"""Настройки для запуска тестов."""
+from .settings import *  # noqa: F401,F403
+
+# Фоновые потоки писали бы в базу и MEDIA_ROOT одновременно с тестами.
+THUMBNAIL_WORKERS = 0
+# Просмотры записываются в конце каждого запроса: при выходе из процесса
+# в буфере не должно остаться приращений для уже удалённой тестовой базы.
+COUNTER_FLUSH_INTERVAL = 0